@@ -1,9 +1,134 @@
 import time
 import json
+import copy
+import atexit
+import sqlite3
+import threading
 import hashlib
+import functools
 import os
-from typing import Dict, Optional, Any
-from datetime import datetime, timedelta
+import mmap
+import queue
+import logging
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+try:
+    import xxhash
+    _key_hasher = xxhash.xxh3_128
+except ImportError:
+    # xxhashが無い環境ではstdlibのblake2b（OpenSSLを経由しない）にフォールバック
+    _key_hasher = functools.partial(hashlib.blake2b, digest_size=16)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windowsではインデックス保存時のプロセス間ロックを行わない
+    fcntl = None
+
+
+def _dumps(obj: Any) -> bytes:
+    """キャッシュデータをUTF-8のJSONバイト列に変換（orjson優先）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    """JSONバイト列をデコード（orjson優先）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    # 標準のjsonはmemoryview（mmap経由の読み込み）を受け付けない
+    if isinstance(raw, memoryview):
+        raw = raw.tobytes()
+    return json.loads(raw)
+
+
+def _msgpack_dumps(obj: Any) -> bytes:
+    """キャッシュデータをmsgpackに変換"""
+    return msgpack.packb(obj, use_bin_type=True, default=str)
+
+
+def _msgpack_loads(raw: bytes) -> Any:
+    """msgpackバイト列をデコード"""
+    return msgpack.unpackb(raw, raw=False)
+
+
+# format -> (拡張子, エンコーダ, デコーダ)
+_FORMATS = {
+    "json": (".json", _dumps, _loads),
+    "msgpack": (".mpk", _msgpack_dumps, _msgpack_loads),
+}
+
+
+# これより大きいキャッシュファイルはmmapで読み、read()によるコピーを避ける
+_MMAP_THRESHOLD = 16 * 1024
+
+# バックグラウンド書き込みスレッドが一度に処理する最大件数
+_WRITE_BATCH_SIZE = 16
+
+# 書き込みスレッドがインデックスを保存する最短間隔（秒）。インデックスの保存は全件の
+# 読み書きになるのでsetごとには行わない（異常終了時は起動時のrebuild_indexで復旧）
+_INDEX_SAVE_INTERVAL = 5.0
+
+# zstdフレームの先頭4バイト（JSON/msgpackのペイロードとは衝突しない）
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# Zstd(De)Compressorはスレッドセーフではないためスレッドごとに保持
+_zstd_local = threading.local()
+
+
+def _zstd_compress(raw: bytes) -> bytes:
+    cctx = getattr(_zstd_local, 'cctx', None)
+    if cctx is None:
+        cctx = _zstd_local.cctx = zstandard.ZstdCompressor(level=1)
+    return cctx.compress(raw)
+
+
+class _ZstdUnavailableError(RuntimeError):
+    """zstandardが無い環境でzstd圧縮エントリを読もうとした（エントリ自体は壊れていない）"""
+
+
+def _zstd_decompress(raw: bytes) -> bytes:
+    if zstandard is None:
+        raise _ZstdUnavailableError("zstd-compressed cache entry requires the zstandard package")
+    dctx = getattr(_zstd_local, 'dctx', None)
+    if dctx is None:
+        dctx = _zstd_local.dctx = zstandard.ZstdDecompressor()
+    return dctx.decompress(raw)
+
+
+def _close_at_exit(manager_ref: "weakref.ref[CacheManager]") -> None:
+    """atexitから呼ばれる（弱参照なので、atexitがインスタンスを生かし続けない）"""
+    manager = manager_ref()
+    if manager is not None:
+        manager.close()
+
+
+def _expires_epoch(expires_at: Any) -> float:
+    """expires_atをエポック秒に変換（旧形式のISO文字列も受け付ける）"""
+    if isinstance(expires_at, str):
+        return datetime.fromisoformat(expires_at).timestamp()
+    return float(expires_at)
 
 class CacheManager:
     """
@@ -11,26 +136,438 @@ class CacheManager:
     BigQueryの結果とAPI呼び出し結果をキャッシュ
     """
     
-    def __init__(self, cache_dir: str = "cache", default_ttl: int = 3600):
+    def __init__(self, cache_dir: str = "cache", default_ttl: int = 3600, memory_cache_size: int = 1024,
+                 format: str = "json", async_writes: bool = True, compress_threshold: Optional[int] = 1024):
         """
         Args:
             cache_dir: キャッシュファイルを保存するディレクトリ
             default_ttl: デフォルトのキャッシュ有効期限（秒）
+            memory_cache_size: ファイルキャッシュの前段に置くメモリLRUの最大件数
+            format: 保存形式（"json" または "msgpack"）
+            async_writes: Trueの場合、ファイル書き込みをバックグラウンドスレッドで行う
+            compress_threshold: このバイト数以上のエントリをzstdで圧縮（Noneで無効、要zstandard）
         """
+        if format not in _FORMATS:
+            raise ValueError(f"Unsupported cache format: {format}")
+        if format == "msgpack" and msgpack is None:
+            raise ImportError("format='msgpack' requires the msgpack package")
+        
         self.cache_dir = cache_dir
         self.default_ttl = default_ttl
+        self.format = format
+        self._ext, self._encode, self._decode = _FORMATS[format]
+        self._compress_threshold = compress_threshold
+        self._hasher = _key_hasher
+        # カテゴリ名 -> エンコード済みプレフィックス（b"bigquery:"等）
+        self._category_prefixes: Dict[str, bytes] = {}
+        # メモリLRU: cache_key -> (有効期限(epoch), category, data)
+        self._mem: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._mem_max = memory_cache_size
+        # 作成済みのシャードディレクトリ（setのたびにmakedirsしないため）
+        self._shards_seen: set = set()
+        # メモリLRUとインデックスはバックグラウンドの書き込みスレッドとも共有する
+        self._lock = threading.RLock()
+        # 書き込みキュー（async_writes=Trueの場合、最初のsetでスレッドを起動）
+        self.async_writes = async_writes
+        self._write_q: "queue.Queue[Tuple[Tuple[str, str, str, float, bytes], Tuple[float, str, Any]]]" = queue.Queue(maxsize=1024)
+        self._writer: Optional[threading.Thread] = None
+        # 書き込み待ちのエントリ（メモリLRUから追い出されても読めるように保持）
+        self._pending: Dict[str, Tuple[float, str, Any]] = {}
+        # get_or_compute用: 計算中のキー -> [完了イベント, 結果, 成功したか]
+        self._inflight: Dict[Tuple[str, str], list] = {}
+        self._inflight_lock = threading.Lock()
         
         # キャッシュディレクトリを作成
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
+        
+        # サイドカーインデックス: cache_key -> (category, 有効期限(epoch), ファイルサイズ)
+        # sweep系メソッドはファイルを開かずにこれだけを走査する
+        self._index_name = f"_index{self._ext}"
+        self._index_path = os.path.join(cache_dir, self._index_name)
+        self._index_lock_path = os.path.join(cache_dir, "_index.lock")
+        self._index: Dict[str, Tuple[str, float, int]] = {}
+        # 前回保存以降に追加・削除したキー（保存時にディスク上のインデックスへマージする）
+        self._index_changed: set = set()
+        self._index_removed: set = set()
+        # Trueの場合、ディスク上のインデックスをマージせず丸ごと置き換える（rebuild_index後）
+        self._index_replace = False
+        self._index_saved_at = time.monotonic()
+        self._load_index()
+        self._atexit_hook = functools.partial(_close_at_exit, weakref.ref(self))
+        atexit.register(self._atexit_hook)
     
-    def _generate_cache_key(self, key_data: str) -> str:
-        """キャッシュキーのハッシュを生成"""
-        return hashlib.md5(key_data.encode('utf-8')).hexdigest()
+    def _category_prefix(self, category: str) -> bytes:
+        """カテゴリのプレフィックスを一度だけエンコードして再利用"""
+        prefix = self._category_prefixes.get(category)
+        if prefix is None:
+            prefix = self._category_prefixes[category] = f"{category}:".encode('utf-8')
+        return prefix
+    
+    def _generate_cache_key(self, category: bytes, key: str) -> str:
+        """キャッシュキーのハッシュを生成（xxh3_128、無ければblake2b）"""
+        h = self._hasher()
+        h.update(category)
+        h.update(key.encode('utf-8'))
+        return h.hexdigest()
     
     def _get_cache_path(self, cache_key: str) -> str:
-        """キャッシュファイルのパスを生成"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
+        """キャッシュファイルのパスを生成（先頭2文字でシャード: cache/ab/abcd....json）"""
+        return os.path.join(self.cache_dir, cache_key[:2], f"{cache_key}{self._ext}")
+    
+    def _ensure_shard(self, cache_path: str) -> None:
+        """シャードディレクトリを必要なら作成"""
+        shard_dir = os.path.dirname(cache_path)
+        if shard_dir not in self._shards_seen:
+            os.makedirs(shard_dir, exist_ok=True)
+            self._shards_seen.add(shard_dir)
+    
+    def _migrate_flat_entries(self) -> None:
+        """シャード導入前の直下にあるエントリファイルをシャードへ移動"""
+        with os.scandir(self.cache_dir) as it:
+            flat_entries = [
+                entry for entry in it
+                if entry.name.endswith(self._ext) and entry.name != self._index_name and entry.is_file()
+            ]
+        for entry in flat_entries:
+            cache_path = self._get_cache_path(entry.name[:-len(self._ext)])
+            try:
+                self._ensure_shard(cache_path)
+                os.replace(entry.path, cache_path)
+            except OSError as e:
+                logger.warning("⚠️ Cache migration error: %s", e)
+    
+    def _compress(self, payload: bytes) -> bytes:
+        """閾値以上のペイロードをzstd(level=1)で圧縮"""
+        if self._compress_threshold is None or zstandard is None or len(payload) < self._compress_threshold:
+            return payload
+        return _zstd_compress(payload)
+    
+    def _decode_payload(self, raw: Any) -> Any:
+        """必要ならzstdを展開してからデコード（先頭のマジックバイトで判定）"""
+        if raw[:4] == _ZSTD_MAGIC:
+            raw = _zstd_decompress(raw)
+        return self._decode(raw)
+    
+    def _read_entry(self, cache_path: str) -> Tuple[Dict, int]:
+        """キャッシュファイルを読み込んでデコード（データとファイルサイズを返す）"""
+        with open(cache_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= _MMAP_THRESHOLD:
+                raw = f.read()
+                return self._decode_payload(raw), len(raw)
+            # 大きいエントリはページキャッシュから直接デコード
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return self._decode_payload(view), size
+    
+    def _atomic_write(self, path: str, payload: bytes) -> None:
+        """一時ファイルに書いてからos.replaceで差し替える（読み手が書きかけのファイルを見ないように）"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _read_index_file(self) -> Dict[str, Tuple[str, float, int]]:
+        """インデックスファイルを読み込む（FileNotFoundErrorやデコードエラーはそのまま送出）"""
+        with open(self._index_path, 'rb') as f:
+            raw_index = self._decode(f.read())
+        return {
+            cache_key: (category, float('inf') if expires_at is None else expires_at, size)
+            for cache_key, (category, expires_at, size) in raw_index.items()
+        }
+    
+    def _index_is_stale(self) -> bool:
+        """
+        インデックスファイルより新しいシャードがあるか
+        （インデックス保存前にプロセスが落ちた場合、書かれたファイルがインデックスに載っていない）
+        """
+        try:
+            index_mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+        with os.scandir(self.cache_dir) as it:
+            return any(
+                len(entry.name) == 2 and entry.is_dir() and entry.stat().st_mtime_ns > index_mtime
+                for entry in it
+            )
+    
+    def _load_index(self) -> None:
+        """インデックスファイルを読み込み、無い・壊れている・古い場合はキャッシュディレクトリから再構築"""
+        self._migrate_flat_entries()
+        try:
+            if self._index_is_stale():
+                self.rebuild_index()
+                return
+            self._index = self._read_index_file()
+        except Exception as e:
+            logger.warning("⚠️ Cache index read error: %s", e)
+            self.rebuild_index()
+    
+    @contextmanager
+    def _index_file_lock(self) -> Iterator[None]:
+        """同じキャッシュディレクトリを使う他プロセスとインデックスの読み書きを排他する"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._index_lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def _save_index(self, refresh: bool = False) -> None:
+        """
+        インデックスの変更をディスク上のインデックスにマージして書き出す
+        （他のインスタンスが保存したエントリも取り込む）
+        
+        Args:
+            refresh: Trueの場合、変更が無くてもディスク上のインデックスを読み直す（sweep前に使用）
+        """
+        with self._lock:
+            replace = self._index_replace
+            if not (replace or self._index_changed or self._index_removed or refresh):
+                return
+            changed = {k: self._index[k] for k in self._index_changed if k in self._index}
+            removed = set(self._index_removed)
+            snapshot = dict(self._index) if replace else None
+            self._index_changed.clear()
+            self._index_removed.clear()
+            self._index_replace = False
+        
+        try:
+            with self._index_file_lock():
+                if replace:
+                    merged = snapshot
+                else:
+                    try:
+                        merged = self._read_index_file()
+                    except FileNotFoundError:
+                        merged = {}
+                    except Exception as e:
+                        logger.warning("⚠️ Cache index read error: %s", e)
+                        merged = {}
+                    merged.update(changed)
+                    for cache_key in removed:
+                        merged.pop(cache_key, None)
+                
+                if replace or changed or removed:
+                    raw_index = {
+                        cache_key: [category, None if expires_at == float('inf') else expires_at, size]
+                        for cache_key, (category, expires_at, size) in merged.items()
+                    }
+                    self._atomic_write(self._index_path, self._encode(raw_index))
+                    self._index_saved_at = time.monotonic()
+            
+            with self._lock:
+                # 保存中に行われた変更は次回の保存まで残す
+                for cache_key in self._index_changed:
+                    if cache_key in self._index:
+                        merged[cache_key] = self._index[cache_key]
+                for cache_key in self._index_removed:
+                    merged.pop(cache_key, None)
+                self._index = merged
+        except Exception as e:
+            logger.warning("⚠️ Cache index write error: %s", e)
+            with self._lock:
+                # 失敗した分は次回の保存で再試行
+                self._index_changed.update(k for k in changed if k not in self._index_removed)
+                self._index_removed.update(k for k in removed if k not in self._index_changed)
+                self._index_replace = self._index_replace or replace
+    
+    def _index_put(self, cache_key: str, category: str, expires_at: float, size: int) -> None:
+        with self._lock:
+            self._index[cache_key] = (category, expires_at, size)
+            self._index_changed.add(cache_key)
+            self._index_removed.discard(cache_key)
+    
+    def _index_discard(self, cache_key: str) -> None:
+        with self._lock:
+            # 自分のインデックスに無くても、他インスタンスが保存したエントリの可能性があるので記録する
+            self._index.pop(cache_key, None)
+            self._index_removed.add(cache_key)
+            self._index_changed.discard(cache_key)
+    
+    def _index_keys_where(self, predicate) -> List[str]:
+        """インデックスから条件に合うcache_keyを抽出"""
+        with self._lock:
+            return [k for k, entry in self._index.items() if predicate(entry)]
+    
+    def _iter_entry_files(self) -> Iterator[os.DirEntry]:
+        """シャード内のエントリファイルを列挙（scandirのDirEntryでstatを省く）"""
+        with os.scandir(self.cache_dir) as it:
+            shard_dirs = [entry.path for entry in it if len(entry.name) == 2 and entry.is_dir()]
+        for shard_dir in shard_dirs:
+            with os.scandir(shard_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(self._ext) and entry.is_file():
+                        yield entry
+    
+    def rebuild_index(self) -> int:
+        """
+        キャッシュファイルを全て読み込んでインデックスを作り直す
+        （インデックスが無い/壊れている場合、他プロセスが書いたファイルを取り込む場合に使用）
+        """
+        self.flush()
+        index = {}
+        for entry in self._iter_entry_files():
+            cache_key = entry.name[:-len(self._ext)]
+            try:
+                cache_data, size = self._read_entry(entry.path)
+                expires_at = cache_data.get('expires_at')
+                expires_at = _expires_epoch(expires_at) if expires_at else float('inf')
+                index[cache_key] = (cache_data.get('category', 'unknown'), expires_at, size)
+            except _ZstdUnavailableError:
+                # zstandardのある環境が書いた有効なエントリなので、インデックスに載せず削除もしない
+                continue
+            except Exception:
+                # 読み込めないファイルは即期限切れとして扱い、clear_expiredで削除させる
+                index[cache_key] = ('unknown', 0.0, entry.stat().st_size)
+        with self._lock:
+            self._index = index
+            self._index_changed.clear()
+            self._index_removed.clear()
+            self._index_replace = True
+        self._save_index()
+        return len(index)
+    
+    def _mem_put(self, cache_key: str, expires: float, category: str, data: Any) -> None:
+        """
+        メモリLRUに登録し、上限を超えたら最も古いエントリを破棄
+        （dataはそのまま保持するので、呼び出し元が他で使わないオブジェクトを渡すこと）
+        """
+        if self._mem_max <= 0:
+            return
+        with self._lock:
+            self._mem[cache_key] = (expires, category, data)
+            self._mem.move_to_end(cache_key)
+            while len(self._mem) > self._mem_max:
+                self._mem.popitem(last=False)
+    
+    def _mem_get(self, cache_key: str) -> Tuple[bool, Any]:
+        """
+        メモリLRU（と書き込み待ちエントリ）を参照し、(ヒットしたか, データ)を返す
+        （ファイルから読んだ場合と同じく、呼び出し元が変更してもキャッシュに影響しないコピーを返す）
+        """
+        with self._lock:
+            mem_entry = self._mem.get(cache_key)
+            if mem_entry is None:
+                pending = self._pending.get(cache_key)
+                if pending is not None and time.time() < pending[0]:
+                    data = pending[2]
+                else:
+                    return False, None
+            elif time.time() < mem_entry[0]:
+                self._mem.move_to_end(cache_key)
+                data = mem_entry[2]
+            else:
+                del self._mem[cache_key]
+                return False, None
+        return True, copy.deepcopy(data)
+    
+    def _mem_discard_where(self, predicate) -> None:
+        """メモリLRUから条件に合うエントリを破棄（predicateは(有効期限, category, data)を受け取る）"""
+        with self._lock:
+            for cache_key in [k for k, entry in self._mem.items() if predicate(entry)]:
+                del self._mem[cache_key]
+    
+    def _write_entry(self, cache_path: str, cache_key: str, category: str, expires_at: float, payload: bytes) -> None:
+        """エンコード済みのエントリをファイルに書き込み、インデックスを更新"""
+        try:
+            payload = self._compress(payload)
+            self._ensure_shard(cache_path)
+            self._atomic_write(cache_path, payload)
+            self._index_put(cache_key, category, expires_at, len(payload))
+        except Exception as e:
+            logger.warning("⚠️ Cache write error: %s", e)
+    
+    def _writer_loop(self) -> None:
+        """書き込みキューを消化するバックグラウンドスレッド"""
+        while True:
+            # インデックスに未保存の変更があれば、書き込みが途切れたところで保存する
+            with self._lock:
+                has_changes = bool(self._index_changed or self._index_removed or self._index_replace)
+            try:
+                first = self._write_q.get(timeout=_INDEX_SAVE_INTERVAL if has_changes else None)
+            except queue.Empty:
+                self._save_index()
+                continue
+            
+            # Noneはclose()からの終了指示
+            if first is None:
+                self._write_q.task_done()
+                return
+            
+            # キューに溜まっている分はまとめて取り出す（最大_WRITE_BATCH_SIZE件）
+            batch = [first]
+            stop = False
+            while len(batch) < _WRITE_BATCH_SIZE:
+                try:
+                    item = self._write_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            # 同じキーへの書き込みはバッチ内で最後のものだけ行う
+            latest = {item[1]: item for item, _ in batch}
+            try:
+                for item in latest.values():
+                    self._write_entry(*item)
+            finally:
+                with self._lock:
+                    for item, entry in batch:
+                        # 後続のsetで置き換えられていなければ書き込み待ちから外す
+                        if self._pending.get(item[1]) is entry:
+                            del self._pending[item[1]]
+                # 書き込みが続く間もインデックスは_INDEX_SAVE_INTERVALごとに保存
+                if time.monotonic() - self._index_saved_at >= _INDEX_SAVE_INTERVAL:
+                    self._save_index()
+                for _ in batch:
+                    self._write_q.task_done()
+            
+            if stop:
+                self._write_q.task_done()
+                return
+    
+    def _enqueue_write(self, item: Tuple[str, str, str, float, bytes], data: Any) -> None:
+        """書き込みをキューに積む（書き込みスレッドは初回に起動）"""
+        cache_key, category, expires_at = item[1], item[2], item[3]
+        entry = (expires_at, category, data)
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="cache-writer", daemon=True)
+                self._writer.start()
+            self._pending[cache_key] = entry
+        self._write_q.put((item, entry))
+    
+    def flush(self) -> None:
+        """キューに積まれた書き込みが全てファイルに反映されるまで待つ"""
+        if self._writer is not None:
+            self._write_q.join()
+    
+    def close(self) -> None:
+        """
+        未反映の書き込みとインデックスを保存し、書き込みスレッドを終了する
+        （終了時にatexitからも呼ばれる。close後にsetした場合はスレッドを起動し直す）
+        """
+        self.flush()
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._write_q.put(None)
+            writer.join()
+        self._save_index()
+        atexit.unregister(self._atexit_hook)
     
     def get(self, key: str, category: str = "general") -> Optional[Dict]:
         """
@@ -43,34 +580,53 @@ class CacheManager:
         Returns:
             キャッシュされたデータまたはNone
         """
-        cache_key = self._generate_cache_key(f"{category}:{key}")
-        cache_path = self._get_cache_path(cache_key)
+        cache_key = self._generate_cache_key(self._category_prefix(category), key)
         
-        if not os.path.exists(cache_path):
-            return None
+        # メモリLRUを優先（ファイルI/OとJSONパースを回避）
+        hit, data = self._mem_get(cache_key)
+        if hit:
+            logger.debug("🔄 Cache hit: %s:%s", category, key)
+            return data
+        
+        cache_path = self._get_cache_path(cache_key)
         
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+            cache_data, size = self._read_entry(cache_path)
             
             # TTLチェック
+            expires_at = float('inf')
             if cache_data.get('expires_at'):
-                expires_at = datetime.fromisoformat(cache_data['expires_at'])
-                if datetime.now() > expires_at:
+                expires_at = _expires_epoch(cache_data['expires_at'])
+                if time.time() > expires_at:
                     # 期限切れのキャッシュを削除
                     os.unlink(cache_path)
+                    self._index_discard(cache_key)
                     return None
             
-            print(f"🔄 Cache hit: {category}:{key}")
-            return cache_data.get('data')
+            # 他プロセスが書いたエントリもインデックスに取り込む
+            if cache_key not in self._index:
+                self._index_put(cache_key, category, expires_at, size)
+            
+            data = cache_data.get('data')
+            self._mem_put(cache_key, expires_at, category, copy.deepcopy(data))
             
+            logger.debug("🔄 Cache hit: %s:%s", category, key)
+            return data
+            
+        except FileNotFoundError:
+            return None
+        except _ZstdUnavailableError:
+            # 他の環境が圧縮して書いたエントリ。壊れてはいないのでミス扱いにしてファイルは残す
+            logger.debug("🔄 Cache miss (zstd entry, zstandard not installed): %s:%s", category, key)
+            return None
         except Exception as e:
-            print(f"⚠️ Cache read error: {e}")
+            logger.warning("⚠️ Cache read error: %s", e)
             # エラーファイルを削除
             try:
                 os.unlink(cache_path)
             except:
                 pass
+            self._index_discard(cache_key)
             return None
     
     def set(self, key: str, data: Any, category: str = "general", ttl: Optional[int] = None) -> None:
@@ -83,96 +639,304 @@ class CacheManager:
             category: キャッシュのカテゴリ
             ttl: キャッシュ有効期限（秒）、Noneの場合はdefault_ttlを使用
         """
-        cache_key = self._generate_cache_key(f"{category}:{key}")
+        cache_key = self._generate_cache_key(self._category_prefix(category), key)
         cache_path = self._get_cache_path(cache_key)
         
         if ttl is None:
             ttl = self.default_ttl
         
-        expires_at = datetime.now() + timedelta(seconds=ttl)
+        # 時刻の取得は1回だけ（メモリLRUとファイルで同じ有効期限を使う）
+        now = time.time()
+        expires_at = now + ttl
+        # 呼び出し元がsetの後でdataを変更しても、メモリLRUと書き込み待ちの内容が変わらないようにコピー
+        snapshot = copy.deepcopy(data)
+        self._mem_put(cache_key, expires_at, category, snapshot)
         
         cache_data = {
             'data': data,
-            'created_at': datetime.now().isoformat(),
-            'expires_at': expires_at.isoformat(),
+            'created_at': now,
+            'expires_at': expires_at,
             'ttl': ttl,
             'key': key,
             'category': category
         }
         
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2, default=str)
+            payload = self._encode(cache_data)
+        except Exception as e:
+            logger.warning("⚠️ Cache write error: %s", e)
+            return
+        
+        # メモリLRUは更新済みなので、ファイル書き込みは呼び出し元を待たせない
+        item = (cache_path, cache_key, category, expires_at, payload)
+        if self.async_writes:
+            self._enqueue_write(item, snapshot)
+        else:
+            self._write_entry(*item)
+        
+        logger.debug("💾 Cached: %s:%s (TTL: %ss)", category, key, ttl)
+    
+    def get_or_compute(self, key: str, category: str, compute_fn: Callable[[], Any],
+                       ttl: Optional[int] = None) -> Any:
+        """
+        キャッシュを取得し、無ければcompute_fnで計算して保存する
+        
+        同じキーを複数スレッドが同時にミスした場合、compute_fnを呼ぶのは最初の1つだけで、
+        残りはその結果を待つ（BigQuery/Gemini/Placesへの重複呼び出しを防ぐ）
+        """
+        data = self.get(key, category)
+        if data is not None:
+            return data
+        
+        flight_key = (category, key)
+        with self._inflight_lock:
+            flight = self._inflight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[flight_key] = [threading.Event(), None, False]
+        
+        if not leader:
+            flight[0].wait()
+            if flight[2]:
+                # リーダーや他の待機スレッドと同じオブジェクトを共有しない
+                return copy.deepcopy(flight[1])
+            # 先行した計算が失敗した場合は自分で計算する
+            return self.get_or_compute(key, category, compute_fn, ttl)
+        
+        try:
+            # 最初のgetから登録までの間に前のリーダーが保存を終えている可能性があるので再確認
+            data = self.get(key, category)
+            if data is not None:
+                flight[1], flight[2] = data, True
+                return data
             
-            print(f"💾 Cached: {category}:{key} (TTL: {ttl}s)")
+            data = compute_fn()
+            if data is not None:
+                self.set(key, data, category, ttl)
+            flight[1], flight[2] = data, True
+            return data
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(flight_key, None)
+            flight[0].set()
+    
+    def _remove_entries(self, cache_keys: List[str]) -> int:
+        """インデックス上のエントリを削除し、削除件数を返す"""
+        cleared_count = 0
+        for cache_key in cache_keys:
+            try:
+                os.unlink(self._get_cache_path(cache_key))
+                cleared_count += 1
+            except FileNotFoundError:
+                pass
+            except Exception:
+                continue
+            self._index_discard(cache_key)
+        self._save_index()
+        return cleared_count
+    
+    def clear_category(self, category: str) -> int:
+        """指定カテゴリのキャッシュをクリア"""
+        self.flush()
+        self._save_index(refresh=True)
+        cleared_count = self._remove_entries(self._index_keys_where(lambda entry: entry[0] == category))
+        self._mem_discard_where(lambda entry: entry[1] == category)
+        
+        logger.info("🗑️ Cleared %s cache entries for category: %s", cleared_count, category)
+        return cleared_count
+    
+    def clear_expired(self) -> int:
+        """期限切れキャッシュをクリア"""
+        self.flush()
+        self._save_index(refresh=True)
+        now = time.time()
+        cleared_count = self._remove_entries(self._index_keys_where(lambda entry: now > entry[1]))
+        self._mem_discard_where(lambda entry: entry[0] <= now)
+        
+        logger.info("🗑️ Cleared %s expired cache entries", cleared_count)
+        return cleared_count
+    
+    def clear_all(self) -> int:
+        """全キャッシュをクリア"""
+        self.flush()
+        cleared_count = 0
+        
+        # インデックスに載っていないファイルも含めて削除
+        for entry in self._iter_entry_files():
+            try:
+                os.unlink(entry.path)
+                cleared_count += 1
+            except Exception:
+                pass
+        
+        with self._lock:
+            self._index.clear()
+            self._index_changed.clear()
+            self._index_removed.clear()
+            self._index_replace = True
+            self._mem.clear()
+            self._pending.clear()
+        self._save_index()
+        
+        logger.info("🗑️ Cleared all %s cache entries", cleared_count)
+        return cleared_count
+    
+    def get_stats(self) -> Dict:
+        """キャッシュの統計情報を取得（インデックスから集計、ファイルは読まない）"""
+        stats = {
+            'total_files': 0,
+            'categories': {},
+            'total_size_bytes': 0,
+            'expired_count': 0
+        }
+        
+        self.flush()
+        self._save_index(refresh=True)
+        now = time.time()
+        
+        with self._lock:
+            entries = list(self._index.values())
+        
+        for category, expires_at, size in entries:
+            stats['total_size_bytes'] += size
+            stats['total_files'] += 1
+            
+            if category not in stats['categories']:
+                stats['categories'][category] = 0
+            stats['categories'][category] += 1
+            
+            # 期限切れチェック
+            if now > expires_at:
+                stats['expired_count'] += 1
+        
+        stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
+        return stats
+
+
+class SQLiteCacheManager(CacheManager):
+    """
+    SQLite(WAL)をバックエンドにしたキャッシュマネージャー
+    1エントリ1ファイルの代わりに cache_dir/cache.db の1テーブルに保存する
+    """
+    
+    def __init__(self, cache_dir: str = "cache", default_ttl: int = 3600, memory_cache_size: int = 1024,
+                 format: str = "json", db_name: str = "cache.db", compress_threshold: Optional[int] = 1024):
+        """
+        Args:
+            cache_dir: cache.dbを保存するディレクトリ
+            default_ttl: デフォルトのキャッシュ有効期限（秒）
+            memory_cache_size: DBの前段に置くメモリLRUの最大件数
+            format: dataカラムのエンコード形式（"json" または "msgpack"）
+            db_name: SQLiteファイル名
+            compress_threshold: このバイト数以上のdataをzstdで圧縮（Noneで無効、要zstandard）
+        """
+        super().__init__(cache_dir, default_ttl, memory_cache_size, format, compress_threshold=compress_threshold)
+        
+        self.db_path = os.path.join(cache_dir, db_name)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, category TEXT, expires_at REAL, data BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_category ON kv (category)")
+    
+    def _load_index(self) -> None:
+        """SQLite自体がインデックスを持つためサイドカーインデックスは使わない"""
+    
+    def _save_index(self, refresh: bool = False) -> None:
+        """SQLite自体がインデックスを持つためサイドカーインデックスは使わない"""
+    
+    def rebuild_index(self) -> int:
+        """SQLiteバックエンドでは不要（件数のみ返す）"""
+        return self.get_stats()['total_files']
+    
+    def get(self, key: str, category: str = "general") -> Optional[Dict]:
+        """キャッシュからデータを取得（期限切れ行はclear_expiredで削除）"""
+        cache_key = self._generate_cache_key(self._category_prefix(category), key)
+        
+        hit, data = self._mem_get(cache_key)
+        if hit:
+            logger.debug("🔄 Cache hit: %s:%s", category, key)
+            return data
+        
+        now = time.time()
+        try:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT data, expires_at FROM kv WHERE key = ? AND expires_at > ?",
+                    (cache_key, now)
+                ).fetchone()
+            if row is None:
+                return None
+            
+            data = self._decode_payload(row[0])
+            self._mem_put(cache_key, row[1], category, copy.deepcopy(data))
+            
+            logger.debug("🔄 Cache hit: %s:%s", category, key)
+            return data
+            
+        except _ZstdUnavailableError:
+            logger.debug("🔄 Cache miss (zstd entry, zstandard not installed): %s:%s", category, key)
+            return None
+        except Exception as e:
+            logger.warning("⚠️ Cache read error: %s", e)
+            return None
+    
+    def set(self, key: str, data: Any, category: str = "general", ttl: Optional[int] = None) -> None:
+        """データをキャッシュに保存（INSERT OR REPLACE）"""
+        cache_key = self._generate_cache_key(self._category_prefix(category), key)
+        
+        if ttl is None:
+            ttl = self.default_ttl
+        
+        expires_at = time.time() + ttl
+        self._mem_put(cache_key, expires_at, category, copy.deepcopy(data))
+        
+        try:
+            payload = self._compress(self._encode(data))
+            with self._db_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, category, expires_at, data) VALUES (?, ?, ?, ?)",
+                    (cache_key, category, expires_at, payload)
+                )
+            
+            logger.debug("💾 Cached: %s:%s (TTL: %ss)", category, key, ttl)
             
         except Exception as e:
-            print(f"⚠️ Cache write error: {e}")
+            logger.warning("⚠️ Cache write error: %s", e)
     
     def clear_category(self, category: str) -> int:
         """指定カテゴリのキャッシュをクリア"""
-        cleared_count = 0
+        with self._db_lock:
+            cleared_count = self._conn.execute("DELETE FROM kv WHERE category = ?", (category,)).rowcount
         
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                cache_path = os.path.join(self.cache_dir, filename)
-                try:
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    if cache_data.get('category') == category:
-                        os.unlink(cache_path)
-                        cleared_count += 1
-                        
-                except Exception:
-                    pass
-        
-        print(f"🗑️ Cleared {cleared_count} cache entries for category: {category}")
+        self._mem_discard_where(lambda entry: entry[1] == category)
+        
+        logger.info("🗑️ Cleared %s cache entries for category: %s", cleared_count, category)
         return cleared_count
     
     def clear_expired(self) -> int:
         """期限切れキャッシュをクリア"""
-        cleared_count = 0
-        now = datetime.now()
+        now = time.time()
+        with self._db_lock:
+            cleared_count = self._conn.execute("DELETE FROM kv WHERE expires_at < ?", (now,)).rowcount
         
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                cache_path = os.path.join(self.cache_dir, filename)
-                try:
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    if cache_data.get('expires_at'):
-                        expires_at = datetime.fromisoformat(cache_data['expires_at'])
-                        if now > expires_at:
-                            os.unlink(cache_path)
-                            cleared_count += 1
-                            
-                except Exception:
-                    # 読み込めないファイルは削除
-                    try:
-                        os.unlink(cache_path)
-                        cleared_count += 1
-                    except:
-                        pass
+        self._mem_discard_where(lambda entry: entry[0] <= now)
         
-        print(f"🗑️ Cleared {cleared_count} expired cache entries")
+        logger.info("🗑️ Cleared %s expired cache entries", cleared_count)
         return cleared_count
     
     def clear_all(self) -> int:
         """全キャッシュをクリア"""
-        cleared_count = 0
-        
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                cache_path = os.path.join(self.cache_dir, filename)
-                try:
-                    os.unlink(cache_path)
-                    cleared_count += 1
-                except Exception:
-                    pass
+        with self._db_lock:
+            cleared_count = self._conn.execute("DELETE FROM kv").rowcount
+        self._mem_discard_where(lambda entry: True)
         
-        print(f"🗑️ Cleared all {cleared_count} cache entries")
+        logger.info("🗑️ Cleared all %s cache entries", cleared_count)
         return cleared_count
     
     def get_stats(self) -> Dict:
@@ -184,33 +948,17 @@ class CacheManager:
             'expired_count': 0
         }
         
-        now = datetime.now()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT category, COUNT(*), SUM(LENGTH(data)), SUM(expires_at < ?) FROM kv GROUP BY category",
+                (time.time(),)
+            ).fetchall()
         
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                cache_path = os.path.join(self.cache_dir, filename)
-                try:
-                    # ファイルサイズ
-                    stats['total_size_bytes'] += os.path.getsize(cache_path)
-                    stats['total_files'] += 1
-                    
-                    # キャッシュデータ読み込み
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    category = cache_data.get('category', 'unknown')
-                    if category not in stats['categories']:
-                        stats['categories'][category] = 0
-                    stats['categories'][category] += 1
-                    
-                    # 期限切れチェック
-                    if cache_data.get('expires_at'):
-                        expires_at = datetime.fromisoformat(cache_data['expires_at'])
-                        if now > expires_at:
-                            stats['expired_count'] += 1
-                            
-                except Exception:
-                    pass
+        for category, count, size, expired in rows:
+            stats['categories'][category] = count
+            stats['total_files'] += count
+            stats['total_size_bytes'] += size or 0
+            stats['expired_count'] += expired or 0
         
         stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
         return stats
@@ -221,36 +969,46 @@ class VenueCache:
     会場検索専用のキャッシュヘルパー
     """
     
+    # カテゴリはCacheManager側でエンコード済みプレフィックスとして再利用されるので、
+    # ここではキーの中身だけを一度で組み立てる（区切りは名前に含まれない\0）
+    _BQ_CATEGORY = "bigquery"
+    _BQ_PREFIX = "venue_search\0"
+    _PLACES_CATEGORY = "places_api"
+    _PLACES_PREFIX = "places_search\0"
+    _DETAIL_CATEGORY = "venue_detail"
+    
     def __init__(self, cache_manager: CacheManager):
         self.cache = cache_manager
     
     def get_bigquery_result(self, venue_name: str, location_hints: str = "") -> Optional[Dict]:
         """BigQuery検索結果のキャッシュを取得"""
-        cache_key = f"venue_search:{venue_name}:{location_hints}"
-        return self.cache.get(cache_key, category="bigquery")
+        return self.cache.get(f"{self._BQ_PREFIX}{venue_name}\0{location_hints}", category=self._BQ_CATEGORY)
     
     def set_bigquery_result(self, venue_name: str, location_hints: str, result: Dict, ttl: int = 1800) -> None:
         """BigQuery検索結果をキャッシュ（30分）"""
-        cache_key = f"venue_search:{venue_name}:{location_hints}"
-        self.cache.set(cache_key, result, category="bigquery", ttl=ttl)
+        self.cache.set(f"{self._BQ_PREFIX}{venue_name}\0{location_hints}", result, category=self._BQ_CATEGORY, ttl=ttl)
     
     def get_places_api_result(self, venue_name: str, location: str) -> Optional[Dict]:
         """Places API検索結果のキャッシュを取得"""
-        cache_key = f"places_search:{venue_name}:{location}"
-        return self.cache.get(cache_key, category="places_api")
+        return self.cache.get(f"{self._PLACES_PREFIX}{venue_name}\0{location}", category=self._PLACES_CATEGORY)
     
     def set_places_api_result(self, venue_name: str, location: str, result: Dict, ttl: int = 3600) -> None:
         """Places API検索結果をキャッシュ（1時間）"""
-        cache_key = f"places_search:{venue_name}:{location}"
-        self.cache.set(cache_key, result, category="places_api", ttl=ttl)
+        self.cache.set(f"{self._PLACES_PREFIX}{venue_name}\0{location}", result, category=self._PLACES_CATEGORY, ttl=ttl)
+    
+    def get_or_search_places_api_result(self, venue_name: str, location: str, search_fn: Callable[[], Optional[Dict]],
+                                        ttl: int = 3600) -> Optional[Dict]:
+        """Places API検索結果を取得し、無ければsearch_fnで検索してキャッシュ（同じ会場の同時検索は1回だけ）"""
+        return self.cache.get_or_compute(f"{self._PLACES_PREFIX}{venue_name}\0{location}", self._PLACES_CATEGORY,
+                                         search_fn, ttl=ttl)
     
     def get_venue_detail(self, place_id: str) -> Optional[Dict]:
         """会場詳細情報のキャッシュを取得"""
-        return self.cache.get(place_id, category="venue_detail")
+        return self.cache.get(place_id, category=self._DETAIL_CATEGORY)
     
     def set_venue_detail(self, place_id: str, result: Dict, ttl: int = 7200) -> None:
         """会場詳細情報をキャッシュ（2時間）"""
-        self.cache.set(place_id, result, category="venue_detail", ttl=ttl)
+        self.cache.set(place_id, result, category=self._DETAIL_CATEGORY, ttl=ttl)
 
 
 class GeminiCache:
@@ -258,41 +1016,94 @@ class GeminiCache:
     Gemini分析専用のキャッシュヘルパー
     """
     
+    _CATEGORY = "gemini"
+    # statのメモは1リクエスト（get→分析→set）の間だけ使う想定。
+    # 長く持つと上書きされた画像に古い分析結果を返すので短いTTLと件数上限を設ける
+    _STAT_TTL = 5.0
+    _STAT_CACHE_SIZE = 256
+    
     def __init__(self, cache_manager: CacheManager):
         self.cache = cache_manager
+        # 画像パス -> (statした時刻, st_mtime, st_size)。同じ画像を続けてstatしないようにメモ化
+        self._stat_cache: "OrderedDict[str, Tuple[float, float, int]]" = OrderedDict()
+        self._stat_lock = threading.Lock()
+    
+    def _key_for(self, image_path: str) -> str:
+        """ファイルの更新時間とサイズを含めてキーを生成（URLはそのまま）"""
+        if image_path.startswith(('http://', 'https://')):
+            return image_path
+        
+        now = time.monotonic()
+        with self._stat_lock:
+            stat = self._stat_cache.get(image_path)
+            if stat is not None and now - stat[0] < self._STAT_TTL:
+                self._stat_cache.move_to_end(image_path)
+                return f"{image_path}\0{stat[1]}\0{stat[2]}"
+        
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return image_path
+        
+        with self._stat_lock:
+            self._stat_cache[image_path] = (now, st.st_mtime, st.st_size)
+            self._stat_cache.move_to_end(image_path)
+            while len(self._stat_cache) > self._STAT_CACHE_SIZE:
+                self._stat_cache.popitem(last=False)
+        return f"{image_path}\0{st.st_mtime}\0{st.st_size}"
+    
+    def invalidate_stat(self, image_path: str) -> None:
+        """画像ファイルを更新した場合にメモ化したstatを破棄"""
+        with self._stat_lock:
+            self._stat_cache.pop(image_path, None)
     
     def get_analysis_result(self, image_path: str) -> Optional[Dict]:
         """画像分析結果のキャッシュを取得"""
-        # ファイルの更新時間とサイズを含めてキーを生成
         try:
-            if os.path.exists(image_path):
-                stat = os.stat(image_path)
-                cache_key = f"{image_path}:{stat.st_mtime}:{stat.st_size}"
-            else:
-                # URLの場合
-                cache_key = image_path
-            
-            return self.cache.get(cache_key, category="gemini")
+            return self.cache.get(self._key_for(image_path), category=self._CATEGORY)
         except Exception:
             return None
     
     def set_analysis_result(self, image_path: str, result: Dict, ttl: int = 86400) -> None:
         """画像分析結果をキャッシュ（24時間）"""
         try:
-            if os.path.exists(image_path):
-                stat = os.stat(image_path)
-                cache_key = f"{image_path}:{stat.st_mtime}:{stat.st_size}"
-            else:
-                # URLの場合
-                cache_key = image_path
-            
-            self.cache.set(cache_key, result, category="gemini", ttl=ttl)
+            self.cache.set(self._key_for(image_path), result, category=self._CATEGORY, ttl=ttl)
         except Exception as e:
-            print(f"⚠️ Failed to cache Gemini result: {e}")
+            logger.warning("⚠️ Failed to cache Gemini result: %s", e)
+    
+    def get_or_compute_analysis_result(self, image_path: str, compute_fn: Callable[[], Optional[Dict]],
+                                       ttl: int = 86400) -> Optional[Dict]:
+        """画像分析結果を取得し、無ければcompute_fnで分析してキャッシュ（同じ画像の同時分析は1回だけ）"""
+        return self.cache.get_or_compute(self._key_for(image_path), self._CATEGORY, compute_fn, ttl=ttl)
+
+
+class GeoCache:
+    """
+    IPジオロケーション専用のキャッシュヘルパー
+    """
+    
+    _CATEGORY = "geo_ip"
+    
+    def __init__(self, cache_manager: CacheManager):
+        self.cache = cache_manager
+    
+    def get_geo_info(self, ip: str) -> Optional[Dict]:
+        """IPアドレスの位置情報のキャッシュを取得"""
+        return self.cache.get(ip, category=self._CATEGORY)
+    
+    def set_geo_info(self, ip: str, result: Dict, ttl: int = 86400) -> None:
+        """IPアドレスの位置情報をキャッシュ（24時間）"""
+        self.cache.set(ip, result, category=self._CATEGORY, ttl=ttl)
+    
+    def get_or_fetch_geo_info(self, ip: str, fetch_fn: Callable[[], Optional[Dict]], ttl: int = 86400) -> Optional[Dict]:
+        """IPアドレスの位置情報を取得し、無ければfetch_fnで取得してキャッシュ（同じIPの同時取得は1回だけ）"""
+        return self.cache.get_or_compute(ip, self._CATEGORY, fetch_fn, ttl=ttl)
 
 
 # 使用例
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    
     # 基本的な使用例
     cache = CacheManager("cache", default_ttl=3600)
     
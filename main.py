@@ -1,35 +1,116 @@
 import json
+import logging
+import re
+import functools
+import threading
 import pandas as pd
 from typing import Dict, Any, List, Union
 import google.generativeai as genai
 import requests
-import tempfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import io
 import os
 from urllib.parse import urlparse
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from google.api_core import exceptions as google_exceptions
+from google.api_core import retry as google_retry
 from google.cloud import bigquery
 from google.oauth2 import service_account
 
 from dotenv import load_dotenv
-from cache_manager import CacheManager, VenueCache, GeminiCache
+from cache_manager import CacheManager, VenueCache, GeminiCache, GeoCache
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables from .env.local file
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env.local'))
+
+# ------------------------------------------------------------
+# BigQuery 設定
+# ------------------------------------------------------------
+project_id = os.getenv("GCP_PROJECT", "linkflyer-469112")
+dataset_id = "linkflyer_api"
+table_id = "venues"
+
+@functools.cache
+def _bq_client() -> bigquery.Client:
+    """
+    BigQueryクライアントを初回使用時に1回だけ作成（認証情報の読み込みと接続を使い回す）
+    サービスアカウントの鍵ファイルは環境変数 GCP_KEY_PATH で指定
+    """
+    key_path = os.getenv(
+        "GCP_KEY_PATH",
+        "/Users/nf/dev/Python/linkflyer_api/credential/linkflyer-469112-5e52e7c54be1.json"
+    )
+    credentials = service_account.Credentials.from_service_account_file(key_path)
+    return bigquery.Client(credentials=credentials, project=project_id)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+def _json_loads(raw: Union[str, bytes]) -> Any:
+    """JSONをデコード（orjson優先。Gemini/Places/ip-apiの応答用）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _json_dumps(obj: Any) -> str:
+    """JSON文字列に変換（orjson優先）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def _json_dumps_bytes(obj: Any) -> bytes:
+    """UTF-8のJSONバイト列に変換（orjson優先。リクエストボディ用）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# ------------------------------------------------------------
+# HTTP: Places API / ip-api / 画像ダウンロードで共有するセッション
+# （同じホストへの接続とTLSハンドシェイクを使い回す）
+# ------------------------------------------------------------
+
+_HTTP = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({'GET', 'POST'}),  # searchTextはPOSTだが副作用なし
+        raise_on_status=False,
+    ),
+)
+_HTTP.mount('https://', _HTTP_ADAPTER)
+_HTTP.mount('http://', _HTTP_ADAPTER)  # ip-api.com（無料版はhttpのみ）
 
 # ------------------------------------------------------------
 # 関数: ip address
 # ------------------------------------------------------------
 
-def get_geo_info(ip: str) -> Dict[str, str]:
+def _fetch_geo_info(ip: str) -> Optional[Dict[str, str]]:
     """
-    Get geolocation using ip-api.com (Free, no API key required)
-    Rate limit: 45 requests per minute
+    ip-api.comに問い合わせる（失敗した場合はNoneを返し、キャッシュしない）
     """
     try:
         url = f"http://ip-api.com/json/{ip}"
-        response = requests.get(url, timeout=10)
+        response = _HTTP.get(url, timeout=10)
         response.raise_for_status()
         
-        data = response.json()
+        data = _json_loads(response.content)
         
         if data.get('status') == 'success':
             return {
@@ -48,25 +129,36 @@ def get_geo_info(ip: str) -> Dict[str, str]:
             }
         else:
             print(f"❌ ip-api.com error: {data.get('message', 'Unknown error')}")
-            return {}
+            return None
             
     except Exception as e:
         print(f"❌ ip-api.com request failed: {e}")
-        return {}
+        return None
+
+def get_geo_info(ip: str, geo_cache: GeoCache = None) -> Dict[str, str]:
+    """
+    Get geolocation using ip-api.com (Free, no API key required)
+    Rate limit: 45 requests per minute
+    """
+    # キャッシュにあればそれを使い、無ければ取得して保存（IPごとの位置情報はほぼ変わらない）
+    # 同じIPを同時に問い合わせるのは1スレッドだけ
+    if geo_cache:
+        return geo_cache.get_or_fetch_geo_info(ip, lambda: _fetch_geo_info(ip)) or {}
+    return _fetch_geo_info(ip) or {}
 
 # ------------------------------------------------------------
 # 関数: gemini
 # ------------------------------------------------------------
 
-def download_image_from_url(url: str) -> str:
+def download_image_from_url(url: str) -> Tuple[bytes, str]:
     """
-    Download image from URL and save to temporary file
+    Download image from URL into memory
     
     Args:
         url (str): Image URL
         
     Returns:
-        str: Path to downloaded temporary file
+        Tuple[bytes, str]: Image bytes and MIME type
     """
     try:
         print(f"📥 Downloading image from: {url}")
@@ -76,94 +168,154 @@ def download_image_from_url(url: str) -> str:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        # Download the image
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # Determine file extension
-        content_type = response.headers.get('content-type', '')
-        if content_type.startswith('image/'):
-            extension = mimetypes.guess_extension(content_type) or '.jpg'
-        else:
-            # Try to get extension from URL
-            parsed_url = urlparse(url)
-            path = parsed_url.path
-            extension = os.path.splitext(path)[1] or '.jpg'
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_file:
-            temp_file.write(response.content)
-            temp_path = temp_file.name
+        # Download the image (kept in memory and passed to Gemini as-is)
+        with _HTTP.get(url, headers=headers, timeout=30) as response:
+            response.raise_for_status()
+            image_bytes = response.content
+            
+            # Determine MIME type
+            content_type = response.headers.get('content-type', '').split(';')[0].strip()
+            if content_type.startswith('image/'):
+                mime_type = content_type
+            else:
+                # Try to guess from URL path
+                mime_type = mimetypes.guess_type(urlparse(url).path)[0] or 'image/jpeg'
         
-        print(f"✅ Image downloaded successfully: {temp_path}")
-        return temp_path
+        print(f"✅ Image downloaded successfully: {len(image_bytes)} bytes ({mime_type})")
+        return image_bytes, mime_type
         
     except Exception as e:
         raise Exception(f"Failed to download image from URL: {str(e)}")
 
-def analyze_event_flyer_flexible(image_source: Union[str, object], api_key: str, gemini_cache: GeminiCache = None) -> pd.DataFrame:
+# Geminiの429/5xxは指数バックオフで再試行（最終的に失敗した場合は呼び出し元で空の結果を返す）
+_GEMINI_RETRY = google_retry.Retry(
+    predicate=google_retry.if_exception_type(
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+    ),
+    initial=1.0,
+    maximum=30.0,
+    multiplier=2.0,
+    timeout=120.0,
+    on_error=lambda e: print(f"⚠️ Gemini API error, retrying: {e}"),
+)
+
+# Geminiから抽出するイベントの列
+_EVENT_COLUMNS = ["date", "event_name", "venue", "location"]
+
+# 構造化出力のスキーマはモジュール読み込み時に1回だけ組み立てる
+# （dictからprotos.Schemaへの変換は1回で済む。SDKはgenerate_contentのたびにto_dictするので、その処理自体は残る）
+_FLYER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "is_event_flyer": {"type": "BOOLEAN"},
+        "confidence": {"type": "NUMBER"},
+        "events": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {col: {"type": "STRING", "nullable": True} for col in _EVENT_COLUMNS},
+            },
+        },
+    },
+    "required": ["is_event_flyer", "events"],
+}
+
+_FLYER_GENERATION_CONFIG = genai.protos.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=_FLYER_SCHEMA,
+    temperature=0.1,
+)
+
+_BATCH_FLYER_GENERATION_CONFIG = genai.protos.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema={
+        "type": "OBJECT",
+        "properties": {"flyers": {"type": "ARRAY", "items": _FLYER_SCHEMA}},
+        "required": ["flyers"],
+    },
+    temperature=0.1,
+)
+
+_GENAI_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=4)
+def _get_model(api_key: str):
     """
-    Analyzes an event flyer image from file path or URL using Google Gemini AI.
-    
-    Args:
-        image_source (Union[str, object]): File path, URL, or uploaded file object
-        api_key (str): Google API key
-        
-    Returns:
-        pd.DataFrame: DataFrame with columns [date, event_name, venue, location] for each event
+    genai.configureとGenerativeModelの生成をAPIキーごとに1回だけ行う
+    （configureはSDKのグローバル状態を書き換えるのでロックする）
     """
-    if not api_key:
-        print("❌ API key is not provided")
-        return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+    with _GENAI_LOCK:
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel('gemini-1.5-flash')
 
-    temp_file_path = None
-    
-    # キャッシュチェック
-    if gemini_cache and isinstance(image_source, str):
-        cached_result = gemini_cache.get_analysis_result(image_source)
-        if cached_result:
-            print(f"🔄 Using cached Gemini analysis for: {image_source}")
-            # キャッシュされた結果をDataFrameに変換
-            if cached_result.get('events'):
-                events_data = []
-                for event in cached_result['events']:
-                    event_data = {
-                        "date": event.get("date"),
-                        "event_name": event.get("event_name"), 
-                        "venue": event.get("venue"),
-                        "location": event.get("location")
-                    }
-                    events_data.append(event_data)
-                
-                df_result = pd.DataFrame(events_data)
-                df_result = clean_event_data(df_result)
-                return df_result
-            else:
-                return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+# これ以下の画像はgenerate_contentにインラインで渡す（リクエスト全体の上限20MBに
+# エンコードのオーバーヘッド分の余裕を持たせる）。超える場合のみupload_file
+_INLINE_IMAGE_MAX_BYTES = 15 * 1024 * 1024
+
+# 長辺がこれを超える画像は送信前に縮小する。フライヤーの小さい文字（日付・会場名）が
+# 読めなくならないよう、Geminiのタイルサイズ(768px)までは縮めない
+_MAX_IMAGE_SIDE = 1536
+
+def _downscale_image(image_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
+    """
+    大きい画像をJPEGに縮小して送信量を減らす（Pillowが無い・縮小で小さくならない場合はそのまま）
+    """
+    if Image is None:
+        return image_bytes, mime_type
     
     try:
-        # Configure Gemini API
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        # Handle different input types
-        if isinstance(image_source, str):
-            if image_source.startswith(('http://', 'https://')):
-                # URL case - download first
-                temp_file_path = download_image_from_url(image_source)
-                uploaded_file = genai.upload_file(temp_file_path)
-                print(f"🖼️ Processing image from URL: {image_source}")
-            else:
-                # File path case
-                uploaded_file = genai.upload_file(image_source)
-                print(f"🖼️ Processing image from file: {image_source}")
-        else:
-            # Assume it's already an uploaded file object
-            uploaded_file = image_source
-            print("🖼️ Processing uploaded file object")
+        with Image.open(io.BytesIO(image_bytes)) as im:
+            if max(im.size) <= _MAX_IMAGE_SIDE:
+                return image_bytes, mime_type
+            # 再エンコードでEXIFの向き情報が消えるので、先に画素を回転しておく
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail((_MAX_IMAGE_SIDE, _MAX_IMAGE_SIDE), Image.LANCZOS)
+            # 透過部分はそのままRGBにすると黒になり暗い文字が読めなくなるので白背景に合成
+            if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+                im = im.convert("RGBA")
+                background = Image.new("RGB", im.size, (255, 255, 255))
+                background.paste(im, mask=im.getchannel("A"))
+                im = background
+            buf = io.BytesIO()
+            im.convert("RGB").save(buf, "JPEG", quality=90, optimize=True)
+    except Exception as e:
+        print(f"⚠️ Image resize skipped: {e}")
+        return image_bytes, mime_type
+    
+    resized = buf.getvalue()
+    if len(resized) >= len(image_bytes):
+        return image_bytes, mime_type
+    
+    print(f"🗜️ Image resized: {len(image_bytes)} -> {len(resized)} bytes")
+    return resized, "image/jpeg"
 
-        # Improved prompt for multiple events
-        prompt = """
+def _image_part(image_bytes: bytes, mime_type: str):
+    """
+    Geminiに渡す画像パートを作成（小さい画像はupload_fileのRPCを省いてインラインで渡す）
+    """
+    image_bytes, mime_type = _downscale_image(image_bytes, mime_type)
+    if len(image_bytes) > _INLINE_IMAGE_MAX_BYTES:
+        return genai.upload_file(io.BytesIO(image_bytes), mime_type=mime_type)
+    return {"mime_type": mime_type, "data": image_bytes}
+
+def _image_part_from_file(image_path: str):
+    """
+    ローカル画像ファイルから画像パートを作成（URLの場合と同じく縮小してからインライン/upload_fileを選ぶ）
+    """
+    mime_type = mimetypes.guess_type(image_path)[0] or 'image/jpeg'
+    with open(image_path, 'rb') as f:
+        return _image_part(f.read(), mime_type)
+
+# Geminiの応答から ```json ... ``` / ``` ... ``` の中身を取り出す
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# Improved prompt for multiple events
+_FLYER_PROMPT = """
         Analyze this event flyer image and extract information about ALL events shown.
         
         For EACH individual event, identify:
@@ -205,87 +357,314 @@ def analyze_event_flyer_flexible(image_source: Union[str, object], api_key: str,
         Extract information as accurately as possible and ensure each event has complete information.
         """
 
-        # Generate content
-        response = model.generate_content([uploaded_file, prompt])
+# Prompt for several flyers in one request (each image is preceded by a "Flyer N:" label)
+_BATCH_FLYER_PROMPT = """
+        The images above are {count} separate event flyers, labelled Flyer 0 to Flyer {last}.
+        Analyze EACH flyer independently, following these instructions for every flyer:
+        """ + _FLYER_PROMPT + """
+        Respond with a single JSON object of this form, with exactly one entry per flyer, in flyer order:
+        {
+            "flyers": [
+                {"is_event_flyer": ..., "confidence": ..., "events": [...]}
+            ]
+        }
+        """
 
-        # Parse the JSON response
-        try:
-            # Clean the response text to extract JSON
-            response_text = response.text
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.rfind("```")
-                response_text = response_text[json_start:json_end].strip()
-
-            result = json.loads(response_text)
-            
-            # Debug output
-            print(f"🔍 Analysis result: is_event_flyer={result.get('is_event_flyer')}, confidence={result.get('confidence')}")
-            
-            # Check if it's an event flyer
-            if not result.get('is_event_flyer', False):
-                print("⚠️ Image is not identified as an event flyer")
-                return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+def _cached_events_df(image_source: Union[str, object], gemini_cache: GeminiCache = None) -> Optional[pd.DataFrame]:
+    """
+    キャッシュ済みの分析結果があればDataFrameで返す（無ければNone）
+    """
+    if not (gemini_cache and isinstance(image_source, str)):
+        return None
+    
+    cached_result = gemini_cache.get_analysis_result(image_source)
+    if not cached_result:
+        return None
+    
+    print(f"🔄 Using cached Gemini analysis for: {image_source}")
+    return _df_from_cached_result(cached_result)
 
-            # Extract events
-            events = result.get('events', [])
-            
-            if not events:
-                print("⚠️ No events found in the flyer")
-                return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+def _df_from_cached_result(cached_result: Dict) -> pd.DataFrame:
+    """
+    キャッシュした分析結果をDataFrameに戻す
+    """
+    # クリーニング済みのDataFrameをそのまま復元（clean_event_dataを再実行しない）
+    if 'cleaned_df_dict' in cached_result:
+        return pd.DataFrame(cached_result['cleaned_df_dict'], dtype=object)
+    # 旧形式のキャッシュ: イベントのリストからDataFrameに変換
+    if cached_result.get('events'):
+        df_result = pd.DataFrame(cached_result['events'], columns=_EVENT_COLUMNS, dtype=object)
+        return clean_event_data(df_result)
+    return pd.DataFrame(columns=_EVENT_COLUMNS)
 
-            # Convert to DataFrame
-            events_data = []
-            for i, event in enumerate(events):
-                event_data = {
-                    "date": event.get("date"),
-                    "event_name": event.get("event_name"), 
-                    "venue": event.get("venue"),
-                    "location": event.get("location")
-                }
-                events_data.append(event_data)
-                print(f"📅 Event {i+1}: {event_data}")
+def _load_image_part(image_source: Union[str, object]):
+    """
+    Handle different input types and return an image part for Gemini
+    """
+    if isinstance(image_source, str):
+        if image_source.startswith(('http://', 'https://')):
+            # URL case - download first
+            image_part = _image_part(*download_image_from_url(image_source))
+            print(f"🖼️ Processing image from URL: {image_source}")
+        else:
+            # File path case
+            image_part = _image_part_from_file(image_source)
+            print(f"🖼️ Processing image from file: {image_source}")
+        return image_part
+    
+    # Assume it's already an uploaded file object
+    print("🖼️ Processing uploaded file object")
+    return image_source
 
-            df_result = pd.DataFrame(events_data)
-            
-            # Clean up the data
-            df_result = clean_event_data(df_result)
-            
-            # 結果をキャッシュに保存
-            if gemini_cache and isinstance(image_source, str):
-                cache_data = {
-                    "is_event_flyer": result.get('is_event_flyer'),
-                    "confidence": result.get('confidence'),
-                    "events": result.get('events', [])
-                }
-                gemini_cache.set_analysis_result(image_source, cache_data)
-            
-            print(f"✅ Successfully extracted {len(df_result)} events")
-            return df_result
+def _parse_response_json(response_text: str) -> Any:
+    """
+    Clean the response text and parse the JSON inside it
+    """
+    fence = _FENCE_RE.search(response_text)
+    if fence:
+        response_text = fence.group(1).strip()
+    return _json_loads(response_text)
+
+def _events_from_result(result: Dict) -> Tuple[pd.DataFrame, Optional[Dict]]:
+    """
+    Convert one flyer's analysis result to a cleaned DataFrame
+    
+    Returns:
+        (DataFrame, キャッシュするデータ)。イベントが無い場合はキャッシュしないのでNone
+    """
+    # Debug output
+    print(f"🔍 Analysis result: is_event_flyer={result.get('is_event_flyer')}, confidence={result.get('confidence')}")
+    
+    # Check if it's an event flyer
+    if not result.get('is_event_flyer', False):
+        print("⚠️ Image is not identified as an event flyer")
+        return pd.DataFrame(columns=_EVENT_COLUMNS), None
+
+    # Extract events
+    events = result.get('events', [])
+    
+    if not events:
+        print("⚠️ No events found in the flyer")
+        return pd.DataFrame(columns=_EVENT_COLUMNS), None
+
+    # Convert to DataFrame (only the expected columns; missing fields become null)
+    df_result = pd.DataFrame(events, columns=_EVENT_COLUMNS, dtype=object)
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, event_data in enumerate(df_result.to_dict('records')):
+            logger.debug("📅 Event %s: %s", i + 1, event_data)
+    
+    # Clean up the data
+    df_result = clean_event_data(df_result)
+    
+    cache_data = {
+        "is_event_flyer": result.get('is_event_flyer'),
+        "confidence": result.get('confidence'),
+        "cleaned_df_dict": df_result.to_dict('list')
+    }
+    
+    print(f"✅ Successfully extracted {len(df_result)} events")
+    return df_result, cache_data
+
+def _events_df_from_result(result: Dict, image_source: Union[str, object], gemini_cache: GeminiCache = None) -> pd.DataFrame:
+    """
+    Convert one flyer's analysis result to a cleaned DataFrame (and cache it)
+    """
+    df_result, cache_data = _events_from_result(result)
+    
+    # 結果をキャッシュに保存
+    if cache_data and gemini_cache and isinstance(image_source, str):
+        gemini_cache.set_analysis_result(image_source, cache_data)
+    
+    return df_result
+
+def _analyze_image_part(model, image_part, image_source: Union[str, object], gemini_cache: GeminiCache = None) -> pd.DataFrame:
+    """
+    読み込み済みの画像パート1枚をGeminiで分析してDataFrameに変換（結果をキャッシュ）
+    """
+    df_result, cache_data = _analyze_image_part_result(model, image_part)
+    
+    # 結果をキャッシュに保存
+    if cache_data and gemini_cache and isinstance(image_source, str):
+        gemini_cache.set_analysis_result(image_source, cache_data)
+    
+    return df_result
+
+def _analyze_image_part_result(model, image_part) -> Tuple[pd.DataFrame, Optional[Dict]]:
+    """
+    読み込み済みの画像パート1枚をGeminiで分析（(DataFrame, キャッシュするデータ)を返す）
+    """
+    try:
+        # Generate content
+        response = model.generate_content(
+            [image_part, _FLYER_PROMPT],
+            generation_config=_FLYER_GENERATION_CONFIG,
+            request_options={"retry": _GEMINI_RETRY}
+        )
+
+        # Parse the JSON response
+        try:
+            result = _parse_response_json(response.text)
+            return _events_from_result(result)
 
         except json.JSONDecodeError as e:
             print(f"❌ JSON parse error: {str(e)}")
             print(f"Raw response: {response.text}")
             
             # Fallback: try to extract using the old format
-            return fallback_extraction(response.text)
+            return fallback_extraction(response.text), None
 
     except Exception as e:
         print(f"❌ Gemini API analysis failed: {str(e)}")
-        return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+        return pd.DataFrame(columns=_EVENT_COLUMNS), None
+
+def analyze_event_flyer_flexible(image_source: Union[str, object], api_key: str, gemini_cache: GeminiCache = None) -> pd.DataFrame:
+    """
+    Analyzes an event flyer image from file path or URL using Google Gemini AI.
+    
+    Args:
+        image_source (Union[str, object]): File path, URL, or uploaded file object
+        api_key (str): Google API key
+        
+    Returns:
+        pd.DataFrame: DataFrame with columns [date, event_name, venue, location] for each event
+    """
+    if not api_key:
+        print("❌ API key is not provided")
+        return pd.DataFrame(columns=_EVENT_COLUMNS)
+
+    # キャッシュチェック
+    cached_df = _cached_events_df(image_source, gemini_cache)
+    if cached_df is not None:
+        return cached_df
+    
+    def analyze() -> Tuple[pd.DataFrame, Optional[Dict]]:
+        try:
+            # Configure Gemini API (configured model is reused across calls)
+            model = _get_model(api_key)
+            image_part = _load_image_part(image_source)
+        except Exception as e:
+            print(f"❌ Gemini API analysis failed: {str(e)}")
+            return pd.DataFrame(columns=_EVENT_COLUMNS), None
+        return _analyze_image_part_result(model, image_part)
+    
+    if not (gemini_cache and isinstance(image_source, str)):
+        return analyze()[0]
+    
+    # 同じ画像を同時に分析するのは1スレッドだけ（他のスレッドは結果を待ってキャッシュから復元）
+    leader_df = []
+    
+    def compute() -> Optional[Dict]:
+        df_result, cache_data = analyze()
+        leader_df.append(df_result)
+        return cache_data
+    
+    cache_data = gemini_cache.get_or_compute_analysis_result(image_source, compute)
+    if leader_df:
+        return leader_df[0]
+    if cache_data:
+        return _df_from_cached_result(cache_data)
+    # 先に分析したスレッドの結果がキャッシュされない結果（イベントなし・エラー）だった
+    print(f"⚠️ No events extracted by the concurrent analysis of: {image_source}")
+    return pd.DataFrame(columns=_EVENT_COLUMNS)
+
+def _try_load_image_part(image_source: Union[str, object]):
+    """
+    画像パートを読み込む（失敗した場合はNone）
+    """
+    try:
+        return _load_image_part(image_source)
+    except Exception as e:
+        print(f"❌ Failed to load image {image_source}: {e}")
+        return None
+
+def analyze_event_flyers_batch(image_sources: List[str], api_key: str, gemini_cache: GeminiCache = None,
+                               batch_size: int = 4) -> List[pd.DataFrame]:
+    """
+    Analyzes several flyers with one Gemini request per batch_size images.
+    
+    Cached flyers are not sent. If a batch response cannot be split per flyer,
+    those flyers are analyzed one by one (reusing the loaded images). If the
+    batch request itself fails (e.g. retries exhausted), its flyers get empty results.
+    
+    Returns:
+        List[pd.DataFrame]: One DataFrame per image, in the same order as image_sources
+    """
+    if not api_key:
+        print("❌ API key is not provided")
+        return [pd.DataFrame(columns=_EVENT_COLUMNS) for _ in image_sources]
+    
+    results: List[Optional[pd.DataFrame]] = [_cached_events_df(source, gemini_cache) for source in image_sources]
+    pending = [i for i, df in enumerate(results) if df is None]
+    if not pending:
+        return results
+    
+    model = _get_model(api_key)
     
-    finally:
-        # Clean up temporary file if created
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                print(f"🗑️ Cleaned up temporary file: {temp_file_path}")
-            except:
-                pass
+    for start in range(0, len(pending), batch_size):
+        group = pending[start:start + batch_size]
+        
+        # 画像のダウンロード・読み込みは並列に（読み込めなかった画像は空の結果）
+        with ThreadPoolExecutor(max_workers=len(group)) as executor:
+            loaded_parts = list(executor.map(_try_load_image_part, [image_sources[i] for i in group]))
+        
+        batch = []
+        for i, image_part in zip(group, loaded_parts):
+            if image_part is None:
+                results[i] = pd.DataFrame(columns=_EVENT_COLUMNS)
+            else:
+                batch.append((i, image_sources[i], image_part))
+        
+        if len(batch) <= 1:
+            for i, source, image_part in batch:
+                results[i] = _analyze_image_part(model, image_part, source, gemini_cache)
+            continue
+        
+        contents = []
+        for n, (_, _, image_part) in enumerate(batch):
+            contents += [f"Flyer {n}:", image_part]
+        contents.append(_BATCH_FLYER_PROMPT.replace("{count}", str(len(batch))).replace("{last}", str(len(batch) - 1)))
+        
+        try:
+            response = model.generate_content(
+                contents,
+                generation_config=_BATCH_FLYER_GENERATION_CONFIG,
+                request_options={"retry": _GEMINI_RETRY}
+            )
+        except Exception as e:
+            # リトライを使い切った失敗を1枚ずつ再送しても同じ結果になるだけなので空の結果にする
+            print(f"❌ Gemini batch analysis failed for {len(batch)} flyers: {e}")
+            for i, _, _ in batch:
+                results[i] = pd.DataFrame(columns=_EVENT_COLUMNS)
+            continue
+        
+        try:
+            flyers = _parse_response_json(response.text).get('flyers')
+            
+            if not isinstance(flyers, list) or len(flyers) != len(batch):
+                raise ValueError(f"expected {len(batch)} flyers in response, got {len(flyers) if isinstance(flyers, list) else 'none'}")
+        
+        except (ValueError, AttributeError, TypeError) as e:
+            # 応答全体の形が想定外の場合は、読み込み済みの画像で1枚ずつ分析し直す
+            print(f"⚠️ Batch response could not be split ({e}), analyzing {len(batch)} flyers one by one")
+            flyers = [None] * len(batch)
+        
+        for (i, source, image_part), result in zip(batch, flyers):
+            # 形の正しい要素だけを使い、壊れている要素の画像だけ1枚で分析し直す
+            if isinstance(result, dict) and isinstance(result.get('events', []), list):
+                try:
+                    results[i] = _events_df_from_result(result, source, gemini_cache)
+                    continue
+                except (ValueError, AttributeError, TypeError) as e:
+                    print(f"⚠️ Malformed batch result for {source}: {e}")
+            elif result is not None:
+                print(f"⚠️ Malformed batch result for {source}")
+            results[i] = _analyze_image_part(model, image_part, source, gemini_cache)
+    
+    return results
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# Date formats accepted from Gemini (anything else is left untouched)
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y')
 
 def clean_event_data(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -296,37 +675,34 @@ def clean_event_data(df: pd.DataFrame) -> pd.DataFrame:
         
     # Remove rows where all essential fields are null
     essential_cols = ['date', 'event_name', 'venue']
-    df_cleaned = df.dropna(subset=essential_cols, how='all')
+    df_cleaned = df.dropna(subset=essential_cols, how='all').copy()
     
-    # Validate and clean dates
-    df_cleaned['date'] = df_cleaned['date'].apply(validate_date)
+    # Validate and clean dates (vectorized; values matching none of _DATE_FORMATS are kept as-is)
+    # Gemini usually returns YYYY-MM-DD already, so only parse the rest
+    dates = df_cleaned['date'].astype(object)
+    needs_parse = dates.notna() & ~dates.astype(str).str.match(_ISO_DATE_RE)
+    if needs_parse.any():
+        raw_dates = dates[needs_parse].astype(str)
+        # Try each format in order; the first one that matches wins
+        parsed_dates = pd.Series(pd.NaT, index=raw_dates.index, dtype='datetime64[ns]')
+        for fmt in _DATE_FORMATS:
+            parsed_dates = parsed_dates.fillna(pd.to_datetime(raw_dates, format=fmt, errors='coerce'))
+        dates[needs_parse] = parsed_dates.dt.strftime('%Y-%m-%d').astype(object).where(
+            parsed_dates.notna(), dates[needs_parse]
+        )
+    df_cleaned['date'] = dates
     
     # Remove empty strings and replace with None
-    for col in df_cleaned.columns:
-        df_cleaned[col] = df_cleaned[col].apply(lambda x: None if x == "" or x == "null" else x)
+    df_cleaned = df_cleaned.astype(object).replace({"": None, "null": None})
+    df_cleaned = df_cleaned.where(df_cleaned.notna(), None)
     
     return df_cleaned.reset_index(drop=True)
 
-def validate_date(date_str):
-    """
-    Validate and standardize date format
-    """
-    if pd.isna(date_str) or not date_str:
-        return None
-        
-    # Try to parse and reformat the date
-    try:
-        import datetime
-        # Handle various date formats
-        for fmt in ['%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y']:
-            try:
-                parsed_date = datetime.datetime.strptime(str(date_str), fmt)
-                return parsed_date.strftime('%Y-%m-%d')
-            except:
-                continue
-        return date_str  # Return original if no format matches
-    except:
-        return date_str
+# fallback_extraction用: JSONとして読めなかった応答から配列を探す（配列が改行をまたいでもマッチ）
+_RE_EVENT_NAMES = re.compile(r'"event_names?":\s*\[(.*?)\]', re.IGNORECASE | re.DOTALL)
+_RE_DATES = re.compile(r'"dates?":\s*\[(.*?)\]', re.IGNORECASE | re.DOTALL)
+_RE_VENUES = re.compile(r'"venues?":\s*\[(.*?)\]', re.IGNORECASE | re.DOTALL)
+_RE_LOCATIONS = re.compile(r'"locations?":\s*\[(.*?)\]', re.IGNORECASE | re.DOTALL)
 
 def fallback_extraction(response_text: str) -> pd.DataFrame:
     """
@@ -335,21 +711,18 @@ def fallback_extraction(response_text: str) -> pd.DataFrame:
     try:
         print("🔄 Attempting fallback extraction...")
         
-        # Try to find lists in the response
-        import re
-        
         # Look for potential event names, dates, venues
-        event_names = re.findall(r'"event_names?":\s*\[(.*?)\]', response_text, re.IGNORECASE)
-        dates = re.findall(r'"dates?":\s*\[(.*?)\]', response_text, re.IGNORECASE)
-        venues = re.findall(r'"venues?":\s*\[(.*?)\]', response_text, re.IGNORECASE)
-        locations = re.findall(r'"locations?":\s*\[(.*?)\]', response_text, re.IGNORECASE)
+        event_names = _RE_EVENT_NAMES.findall(response_text)
+        dates = _RE_DATES.findall(response_text)
+        venues = _RE_VENUES.findall(response_text)
+        locations = _RE_LOCATIONS.findall(response_text)
         
         if event_names and dates:
             # Parse the lists
-            event_list = [item.strip('"').strip() for item in event_names[0].split(',')]
-            date_list = [item.strip('"').strip() for item in dates[0].split(',')]
-            venue_list = [item.strip('"').strip() for item in venues[0].split(',')] if venues else []
-            location_list = [item.strip('"').strip() for item in locations[0].split(',')] if locations else []
+            event_list = [item.strip().strip('"') for item in event_names[0].split(',')]
+            date_list = [item.strip().strip('"') for item in dates[0].split(',')]
+            venue_list = [item.strip().strip('"') for item in venues[0].split(',')] if venues else []
+            location_list = [item.strip().strip('"') for item in locations[0].split(',')] if locations else []
             
             # Create DataFrame with proper alignment
             max_length = max(len(date_list), len(event_list))
@@ -368,7 +741,21 @@ def fallback_extraction(response_text: str) -> pd.DataFrame:
     except Exception as e:
         print(f"❌ Fallback extraction failed: {e}")
     
-    return pd.DataFrame(columns=["date", "event_name", "venue", "location"])
+    return pd.DataFrame(columns=_EVENT_COLUMNS)
+
+def _print_events(df_events: pd.DataFrame) -> None:
+    """
+    Display extracted events
+    """
+    print(f"\n📋 Extracted {len(df_events)} events:")
+    print("=" * 80)
+    for idx, row in df_events.iterrows():
+        print(f"Event {idx + 1}:")
+        print(f"  📅 Date: {row['date']}")
+        print(f"  🎵 Event: {row['event_name']}")
+        print(f"  🏢 Venue: {row['venue']}")
+        print(f"  📍 Location: {row['location']}")
+        print("-" * 40)
 
 def process_flyer_improved(image_source: Union[str, object], api_key: str, gemini_cache: GeminiCache = None) -> pd.DataFrame:
     """
@@ -393,68 +780,174 @@ def process_flyer_improved(image_source: Union[str, object], api_key: str, gemin
         return df_events
     
     # Display results
-    print(f"\n📋 Extracted {len(df_events)} events:")
-    print("=" * 80)
-    for idx, row in df_events.iterrows():
-        print(f"Event {idx + 1}:")
-        print(f"  📅 Date: {row['date']}")
-        print(f"  🎵 Event: {row['event_name']}")
-        print(f"  🏢 Venue: {row['venue']}")
-        print(f"  📍 Location: {row['location']}")
-        print("-" * 40)
+    _print_events(df_events)
     
     return df_events
 
+def process_flyer_improved_batch(images: List[str], api_key: str, gemini_cache: GeminiCache = None,
+                                 batch_size: int = 4) -> List[pd.DataFrame]:
+    """
+    Process several flyers, sending up to batch_size images per Gemini request
+    
+    Args:
+        images: File paths or URLs
+        api_key: Google API key
+        
+    Returns:
+        List[pd.DataFrame]: One DataFrame per image, in the same order as images
+    """
+    print(f"🌐 Processing {len(images)} flyers (batch size {batch_size})")
+    
+    results = analyze_event_flyers_batch(images, api_key, gemini_cache, batch_size)
+    
+    for image, df_events in zip(images, results):
+        print(f"\n🖼️ {image}")
+        if len(df_events) == 0:
+            print("⚠️ No events extracted from the flyer")
+        else:
+            _print_events(df_events)
+    
+    return results
+
+def process_flyers_batch(images: List[str], api_key: str, gemini_cache: GeminiCache = None) -> List[pd.DataFrame]:
+    """
+    Process multiple flyers in parallel (each Gemini call is mostly network wait)
+    
+    Args:
+        images: File paths or URLs
+        api_key: Google API key
+        
+    Returns:
+        List[pd.DataFrame]: One DataFrame per image, in the same order as images
+    """
+    if not images:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(images))) as executor:
+        return list(executor.map(lambda image: process_flyer_improved(image, api_key, gemini_cache), images))
+
 # ------------------------------------------------------------
 # 関数: places API & Bigquery
 # ------------------------------------------------------------
 
-def call_text_search_api(venue: str, location: str, api_key: str, venue_cache: VenueCache = None) -> Optional[Dict]:
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+def normalize_search_text(text) -> str:
     """
-    Text Search API - place_idとdisplay_nameのみ取得
+    キャッシュ・重複排除用に検索文字列を正規化（小文字化・記号と余分な空白を除去）
     """
-    # キャッシュチェック
-    if venue_cache:
-        cached_result = venue_cache.get_places_api_result(venue, location)
-        if cached_result:
-            return cached_result
+    if not text:
+        return ""
+    return _NON_WORD_RE.sub(' ', str(text).lower()).strip()
+
+# Detail APIと同じフィールド（Text Searchではplaces.を付けて指定）
+_PLACE_DETAIL_FIELDS = "displayName,formattedAddress,businessStatus,location,types,addressComponents"
+_TEXT_SEARCH_FIELD_MASK = "places.id," + ",".join(f"places.{field}" for field in _PLACE_DETAIL_FIELDS.split(","))
+
+# addressComponentsから取り出すtype（国・都道府県・市区町村）
+_ADDRESS_TYPES = frozenset({"country", "administrative_area_level_1", "locality"})
+
+def _detail_from_place(place_id: str, data: Dict) -> Dict:
+    """
+    Places API (New) のPlaceオブジェクトをdetailapi_*形式のdictに変換
+    """
+    # Address componentsから国・都道府県・市区町村を抽出（1回の走査でtype -> shortText）
+    address = {
+        component_type: component.get("shortText", "")
+        for component in data.get('addressComponents', [])
+        for component_type in component.get("types", [])
+        if component_type in _ADDRESS_TYPES
+    }
     
-    url = "https://places.googleapis.com/v1/places:searchText"
-    payload = {"textQuery": f"{venue} {location}"}
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "places.id,places.displayName",
-        "Accept-Language": "en-US,en;q=0.9"
+    return {
+        "detailapi_place_id": place_id,
+        "detailapi_display_name": data.get('displayName', {}).get('text'),
+        "detailapi_formatted_address": data.get('formattedAddress'),
+        "detailapi_business_status": data.get('businessStatus'),
+        "detailapi_types": data.get('types', []),
+        "detailapi_latitude": data.get('location', {}).get('latitude'),
+        "detailapi_longitude": data.get('location', {}).get('longitude'),
+        "detailapi_country": address.get("country"),
+        "detailapi_administrative_area_level_1": address.get("administrative_area_level_1"),
+        "detailapi_locality": address.get("locality")
     }
 
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+def call_text_search_api(venue: str, location: str, api_key: str, venue_cache: VenueCache = None) -> Optional[Dict]:
+    """
+    Text Search API - place_id・display_nameに加えて会場詳細（detailapi_*）も1回で取得
+    """
+    # 表記ゆれ（大文字小文字・記号・空白）があっても同じキャッシュを使う
+    venue_key = normalize_search_text(venue)
+    location_key = normalize_search_text(location)
+    
+    def search() -> Optional[Dict]:
+        url = "https://places.googleapis.com/v1/places:searchText"
+        payload = {"textQuery": f"{venue} {location}"}
+        headers = {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": api_key,
+            "X-Goog-FieldMask": _TEXT_SEARCH_FIELD_MASK,
+            "Accept-Language": "en-US,en;q=0.9"
+        }
 
-        if "places" in data and data["places"]:
-            p = data["places"][0]
-            result = {
-                "textsearch_place_id": p.get("id"),
-                "textsearch_display_name": p.get("displayName", {}).get("text")
-            }
+        try:
+            # リクエストボディもorjsonでエンコード（日本語の会場名があるのでUTF-8のbytesで渡す）
+            resp = _HTTP.post(url, headers=headers, data=_json_dumps_bytes(payload), timeout=10)
+            resp.raise_for_status()
+            data = _json_loads(resp.content)
+
+            if "places" in data and data["places"]:
+                p = data["places"][0]
+                return {
+                    "textsearch_place_id": p.get("id"),
+                    "textsearch_display_name": p.get("displayName", {}).get("text"),
+                    **_detail_from_place(p.get("id"), p)
+                }
             
-            # 結果をキャッシュに保存
+            # 結果なしの場合もキャッシュ（短時間）
             if venue_cache:
-                venue_cache.set_places_api_result(venue, location, result)
+                venue_cache.set_places_api_result(venue_key, location_key, {"_miss": True}, ttl=300)  # 5分間
             
-            return result
-        
-        # 結果なしの場合もキャッシュ（短時間）
-        if venue_cache:
-            venue_cache.set_places_api_result(venue, location, None, ttl=300)  # 5分間
-        
-        return None
-        
-    except Exception as e:
-        print(f"❌ Text Search failed: {e}")
-        return None
+            return None
+            
+        except Exception as e:
+            print(f"❌ Text Search failed: {e}")
+            return None
+    
+    # キャッシュにあればそれを使い、無ければ検索して保存（同じ会場を同時に検索するのは1スレッドだけ）
+    if venue_cache:
+        result = venue_cache.get_or_search_places_api_result(venue_key, location_key, search)
+        return None if not result or result.get('_miss') else result
+    return search()
+
+_VENUE_COLUMNS = """
+            place_id,
+            display_name,
+            formatted_address,
+            business_status,
+            types,
+            latitude,
+            longitude,
+            country,
+            administrative_area_level_1,
+            locality"""
+
+def _venue_from_bigquery_row(row) -> Dict:
+    """
+    venuesテーブルの1行をdetailapi_*形式のdictに変換
+    """
+    return {
+        "detailapi_place_id": row.place_id,
+        "detailapi_display_name": row.display_name,
+        "detailapi_formatted_address": row.formatted_address,
+        "detailapi_business_status": row.business_status,
+        "detailapi_types": _json_loads(row.types) if row.types else [],
+        "detailapi_latitude": float(row.latitude) if row.latitude else None,
+        "detailapi_longitude": float(row.longitude) if row.longitude else None,
+        "detailapi_country": row.country,
+        "detailapi_administrative_area_level_1": row.administrative_area_level_1,
+        "detailapi_locality": row.locality
+    }
 
 def get_venue_from_bigquery(place_id: str, venue_cache: VenueCache = None) -> Optional[Dict]:
     """
@@ -465,21 +958,11 @@ def get_venue_from_bigquery(place_id: str, venue_cache: VenueCache = None) -> Op
         cached_result = venue_cache.get_venue_detail(place_id)
         if cached_result:
             print(f"🔄 Using cached BigQuery result for: {place_id}")
-            return cached_result
+            return None if cached_result.get('_miss') else cached_result
     
     try:
         query = f"""
-        SELECT 
-            place_id,
-            display_name,
-            formatted_address,
-            business_status,
-            types,
-            latitude,
-            longitude,
-            country,
-            administrative_area_level_1,
-            locality
+        SELECT {_VENUE_COLUMNS}
         FROM `{project_id}.{dataset_id}.{table_id}`
         WHERE place_id = @place_id
         LIMIT 1
@@ -491,23 +974,12 @@ def get_venue_from_bigquery(place_id: str, venue_cache: VenueCache = None) -> Op
             ]
         )
         
-        query_job = bq_client.query(query, job_config=job_config)
+        query_job = _bq_client().query(query, job_config=job_config)
         results = query_job.result()
         
         for row in results:
             print(f"✅ Found in BigQuery: {place_id}")
-            result = {
-                "detailapi_place_id": row.place_id,
-                "detailapi_display_name": row.display_name,
-                "detailapi_formatted_address": row.formatted_address,
-                "detailapi_business_status": row.business_status,
-                "detailapi_types": json.loads(row.types) if row.types else [],
-                "detailapi_latitude": float(row.latitude) if row.latitude else None,
-                "detailapi_longitude": float(row.longitude) if row.longitude else None,
-                "detailapi_country": row.country,
-                "detailapi_administrative_area_level_1": row.administrative_area_level_1,
-                "detailapi_locality": row.locality
-            }
+            result = _venue_from_bigquery_row(row)
             
             # 結果をキャッシュに保存
             if venue_cache:
@@ -522,6 +994,61 @@ def get_venue_from_bigquery(place_id: str, venue_cache: VenueCache = None) -> Op
         print(f"❌ BigQuery search failed: {e}")
         return None
 
+def get_venues_from_bigquery_batch(place_ids: List[str], venue_cache: VenueCache = None) -> Dict[str, Optional[Dict]]:
+    """
+    複数のplace_idをまとめて検索（キャッシュにないものだけを1回のクエリで取得）
+    
+    Returns:
+        Dict[str, Optional[Dict]]: place_id -> 会場データ
+            （見つからなかったplace_idは含まない。BigQueryにもDetail APIにも無いと
+            キャッシュ済みのplace_idはNone）
+    """
+    found = {}
+    remaining = []
+    
+    # キャッシュチェック
+    for place_id in place_ids:
+        cached_result = venue_cache.get_venue_detail(place_id) if venue_cache else None
+        if cached_result:
+            print(f"🔄 Using cached BigQuery result for: {place_id}")
+            found[place_id] = None if cached_result.get('_miss') else cached_result
+        else:
+            remaining.append(place_id)
+    
+    if not remaining:
+        return found
+    
+    try:
+        query = f"""
+        SELECT {_VENUE_COLUMNS}
+        FROM `{project_id}.{dataset_id}.{table_id}`
+        WHERE place_id IN UNNEST(@place_ids)
+        """
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("place_ids", "STRING", remaining)
+            ]
+        )
+        
+        query_job = _bq_client().query(query, job_config=job_config)
+        
+        for row in query_job.result():
+            if row.place_id in found:
+                continue
+            result = found[row.place_id] = _venue_from_bigquery_row(row)
+            
+            # 結果をキャッシュに保存
+            if venue_cache:
+                venue_cache.set_venue_detail(row.place_id, result)
+        
+        print(f"✅ Found {len(found)}/{len(place_ids)} venues in BigQuery")
+        
+    except Exception as e:
+        print(f"❌ BigQuery batch search failed: {e}")
+    
+    return found
+
 def call_detail_api(place_id: str, api_key: str) -> Optional[Dict]:
     """
     Detail API - 9つのフィールド取得（display_name追加）
@@ -529,164 +1056,264 @@ def call_detail_api(place_id: str, api_key: str) -> Optional[Dict]:
     url = f"https://places.googleapis.com/v1/places/{place_id}"
     headers = {
         "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "displayName,formattedAddress,businessStatus,location,types,addressComponents",
+        "X-Goog-FieldMask": _PLACE_DETAIL_FIELDS,
         "Accept-Language": "en-US,en;q=0.9"
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = _HTTP.get(url, headers=headers, timeout=10)
         resp.raise_for_status()
         
         if resp.status_code == 200:
-            data = resp.json()
-            
-            # Address componentsから国・都道府県・市区町村を抽出
-            address_components = data.get('addressComponents', [])
-            country = None
-            administrative_area_level_1 = None
-            locality = None
-            
-            for component in address_components:
-                types = component.get("types", [])
-                short_text = component.get("shortText", "")
-                
-                if "country" in types:
-                    country = short_text
-                elif "administrative_area_level_1" in types:
-                    administrative_area_level_1 = short_text
-                elif "locality" in types:
-                    locality = short_text
-
+            data = _json_loads(resp.content)
             print(f"✅ Detail API retrieved: {place_id}")
-            return {
-                "detailapi_place_id": place_id,
-                "detailapi_display_name": data.get('displayName', {}).get('text'),
-                "detailapi_formatted_address": data.get('formattedAddress'),
-                "detailapi_business_status": data.get('businessStatus'),
-                "detailapi_types": data.get('types', []),
-                "detailapi_latitude": data.get('location', {}).get('latitude'),
-                "detailapi_longitude": data.get('location', {}).get('longitude'),
-                "detailapi_country": country,
-                "detailapi_administrative_area_level_1": administrative_area_level_1,
-                "detailapi_locality": locality
-            }
+            return _detail_from_place(place_id, data)
         return None
 
     except Exception as e:
         print(f"❌ Detail API failed: {e}")
         return None
 
-def save_venue_to_bigquery(place_id: str, venue_data: Dict):
+def save_venues_to_bigquery(venues: List[Tuple[str, Dict]]):
     """
-    新しい会場データをBigQueryに保存（display_name追加）
+    新しい会場データをまとめてBigQueryに保存（ストリーミング挿入を1回だけ実行）
+    
+    Args:
+        venues: (place_id, 会場データ) のリスト
     """
+    if not venues:
+        return
+    
+    rows = [
+        {
+            "place_id": place_id,
+            "display_name": venue_data.get('detailapi_display_name'),
+            "formatted_address": venue_data.get('detailapi_formatted_address'),
+            "business_status": venue_data.get('detailapi_business_status'),
+            # typesをJSON文字列に変換
+            "types": _json_dumps(venue_data.get('detailapi_types', [])),
+            "latitude": venue_data.get('detailapi_latitude'),
+            "longitude": venue_data.get('detailapi_longitude'),
+            "country": venue_data.get('detailapi_country'),
+            "administrative_area_level_1": venue_data.get('detailapi_administrative_area_level_1'),
+            "locality": venue_data.get('detailapi_locality')
+        }
+        for place_id, venue_data in venues
+    ]
+    
     try:
-        # typesをJSON文字列に変換
-        types_json = json.dumps(venue_data.get('detailapi_types', []))
-        
-        insert_query = f"""
-        INSERT INTO `{project_id}.{dataset_id}.{table_id}` 
-        (place_id, display_name, formatted_address, business_status, types, latitude, longitude, 
-         country, administrative_area_level_1, locality)
-        VALUES 
-        (@place_id, @display_name, @formatted_address, @business_status, @types, @latitude, @longitude,
-         @country, @administrative_area_level_1, @locality)
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("place_id", "STRING", place_id),
-                bigquery.ScalarQueryParameter("display_name", "STRING", venue_data.get('detailapi_display_name')),
-                bigquery.ScalarQueryParameter("formatted_address", "STRING", venue_data.get('detailapi_formatted_address')),
-                bigquery.ScalarQueryParameter("business_status", "STRING", venue_data.get('detailapi_business_status')),
-                bigquery.ScalarQueryParameter("types", "STRING", types_json),
-                bigquery.ScalarQueryParameter("latitude", "FLOAT", venue_data.get('detailapi_latitude')),
-                bigquery.ScalarQueryParameter("longitude", "FLOAT", venue_data.get('detailapi_longitude')),
-                bigquery.ScalarQueryParameter("country", "STRING", venue_data.get('detailapi_country')),
-                bigquery.ScalarQueryParameter("administrative_area_level_1", "STRING", venue_data.get('detailapi_administrative_area_level_1')),
-                bigquery.ScalarQueryParameter("locality", "STRING", venue_data.get('detailapi_locality'))
-            ]
+        # DMLのINSERTと違いクエリジョブを待たない。row_idsで再送時の重複を防ぐ
+        errors = _bq_client().insert_rows_json(
+            f"{project_id}.{dataset_id}.{table_id}",
+            rows,
+            row_ids=[row["place_id"] for row in rows]
         )
         
-        query_job = bq_client.query(insert_query, job_config=job_config)
-        query_job.result()
-        
-        print(f"✅ Saved to BigQuery: {place_id}")
+        if errors:
+            print(f"❌ Failed to save to BigQuery: {errors}")
+        else:
+            print(f"✅ Saved to BigQuery: {', '.join(row['place_id'] for row in rows)}")
         
     except Exception as e:
         print(f"❌ Failed to save to BigQuery: {e}")
 
-def get_venue_details(place_id: str, api_key: str, venue_cache: VenueCache = None) -> Optional[Dict]:
+def save_venue_to_bigquery(place_id: str, venue_data: Dict):
     """
-    会場詳細取得: BigQuery優先、なければDetail API
+    新しい会場データをBigQueryに保存（display_name追加）
+    """
+    save_venues_to_bigquery([(place_id, venue_data)])
+
+def fetch_and_store_venue_detail(place_id: str, api_key: str, venue_cache: VenueCache = None,
+                                 save_to_bigquery: bool = True) -> Optional[Dict]:
+    """
+    Detail APIで会場詳細を取得し、BigQueryとキャッシュに保存
+    （save_to_bigquery=Falseの場合、BigQueryへの保存は呼び出し元でまとめて行う）
     """
-    # Step 1: BigQueryから検索
-    bq_result = get_venue_from_bigquery(place_id, venue_cache)
-    
-    if bq_result:
-        return bq_result
-    
-    # Step 2: BigQueryにない場合はDetail API
     print(f"🔍 Calling Detail API for: {place_id}")
     detail_result = call_detail_api(place_id, api_key)
     
     if detail_result:
         # Detail APIで取得したデータをBigQueryに保存
-        save_venue_to_bigquery(place_id, detail_result)
+        if save_to_bigquery:
+            save_venue_to_bigquery(place_id, detail_result)
         
         # キャッシュにも保存
         if venue_cache:
             venue_cache.set_venue_detail(place_id, detail_result)
-        
-        return detail_result
+    elif venue_cache:
+        # 結果なしの場合もキャッシュ（短時間）
+        venue_cache.set_venue_detail(place_id, {"_miss": True}, ttl=600)  # 10分間
+    
+    return detail_result
+
+def get_venue_details(place_id: str, api_key: str, venue_cache: VenueCache = None) -> Optional[Dict]:
+    """
+    会場詳細取得: BigQuery優先、なければDetail API
+    """
+    # 直近にBigQueryにもDetail APIにも無かった会場はスキップ
+    if venue_cache:
+        cached_result = venue_cache.get_venue_detail(place_id)
+        if cached_result and cached_result.get('_miss'):
+            return None
+    
+    # Step 1: BigQueryから検索
+    bq_result = get_venue_from_bigquery(place_id, venue_cache)
+    
+    if bq_result:
+        return bq_result
     
-    return None
+    # Step 2: BigQueryにない場合はDetail API
+    return fetch_and_store_venue_detail(place_id, api_key, venue_cache)
+
+# Places API / BigQuery を同時に叩く最大数（Places APIのQPS上限に余裕を持たせる）
+MAX_API_WORKERS = 8
+
+def _map_each(executor: ThreadPoolExecutor, fn, items: list, label=str) -> list:
+    """
+    executor.mapと同じく入力順に結果を返す。ただし失敗した要素はNoneにして残りの処理を続ける
+    （labelは失敗時のログに出す要素の表示名）
+    """
+    futures = [executor.submit(fn, item) for item in items]
+    results = []
+    for item, future in zip(items, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"❌ Venue lookup failed for {label(item)}: {e}")
+            results.append(None)
+    return results
+
+def _column_values(df: pd.DataFrame, col: str, default=None) -> list:
+    """
+    列をPythonのリストで一度に取り出す（列が無い場合・欠損値はdefault）
+    """
+    if col not in df.columns:
+        return [default] * len(df)
+    values = df[col].astype(object)
+    return values.where(values.notna(), default).tolist()
+
+def _search_event_venue(idx: int, event_name, venue, location, api_key: str, venue_cache: VenueCache = None) -> Optional[Dict]:
+    """
+    1イベント分のText Search
+    """
+    print(f"\n📍 Event {idx + 1}: {event_name}")
+    print(f"🔍 Searching: {venue} {location}")
+    text_result = call_text_search_api(venue, location, api_key, venue_cache)
+    
+    if text_result:
+        print(f"✅ Found by text search: {text_result['textsearch_display_name']}")
+    else:
+        print("⚠️ Venue not found")
+    return text_result
 
 def process_events_with_bigquery(df_events, api_key: str, venue_cache: VenueCache = None):
     """
     df_eventsの各行を処理（BigQuery優先）
+    
+    1. 全行のText Searchを並列実行（同じ会場は1回だけ。会場詳細も同時に取得）
+    2. 見つかったplace_idをまとめて1回のBigQueryクエリで検索
+    3. BigQueryになかった会場はText Searchの詳細を使う
+       （詳細を含まない古いキャッシュ結果の場合のみDetail APIを並列実行）
+    4. 新しい会場をまとめてBigQueryに保存
+    結果は行の順番で返す
     """
     print(f"🚀 Processing {len(df_events)} events (BigQuery first)")
     
-    results = []
-    
-    for idx, row in df_events.iterrows():
-        print(f"\n📍 Event {idx + 1}: {row.get('event_name', 'Unknown')}")
+    # 同時実行数をMAX_API_WORKERSに制限してレート制限の代わりにする
+    # （1件の失敗でバッチ全体を止めないよう、各要素の例外は個別に処理）
+    with ThreadPoolExecutor(max_workers=MAX_API_WORKERS) as executor:
+        # Step 1: Text Search（行ごとのSeriesを作らず列をまとめて取り出す）
+        event_names = _column_values(df_events, 'event_name', 'Unknown')
+        venues = _column_values(df_events, 'venue')
+        locations = _column_values(df_events, 'location', '')
         
-        venue = row.get('venue')
-        location = row.get('location', '')
+        # 同じ会場（正規化後）は1回だけ検索し、結果を該当する全行に配る
+        row_keys = [
+            (normalize_search_text(venue), normalize_search_text(location)) if venue else None
+            for venue, location in zip(venues, locations)
+        ]
+        first_rows = {}
+        for i, key in enumerate(row_keys):
+            if key is not None:
+                first_rows.setdefault(key, i)
         
-        if venue:
-            print(f"🔍 Searching: {venue} {location}")
-            
-            # Step 1: Text Search
-            text_result = call_text_search_api(venue, location, api_key, venue_cache)
-            
-            if text_result:
-                print(f"✅ Found by text search: {text_result['textsearch_display_name']}")
-                
-                # Step 2: BigQuery優先でDetail取得
-                place_id = text_result['textsearch_place_id']
-                detail_result = get_venue_details(place_id, api_key, venue_cache)
-                
-                if detail_result:
-                    # Text SearchとDetailの結果をマージ
-                    combined_result = {**text_result, **detail_result}
-                    results.append(combined_result)
-                    print(f"✅ Detail: {detail_result['detailapi_country']}, {detail_result['detailapi_administrative_area_level_1']}, {detail_result['detailapi_locality']}")
-                else:
-                    results.append(text_result)
-                    print("⚠️ Detail retrieval failed")
+        # キャッシュ済みの会場はその場で結果を使い、Places APIはキャッシュにない会場だけ
+        result_by_key = {}
+        if venue_cache:
+            for key in first_rows:
+                cached_result = venue_cache.get_places_api_result(*key)
+                if cached_result:
+                    result_by_key[key] = None if cached_result.get('_miss') else cached_result
+            if first_rows:
+                print(f"🔄 Text Search cache hits: {len(result_by_key)}/{len(first_rows)} "
+                      f"({len(result_by_key) / len(first_rows):.0%})")
+        
+        search_keys = [key for key in first_rows if key not in result_by_key]
+        search_results = _map_each(
+            executor,
+            lambda i: _search_event_venue(i, event_names[i], venues[i], locations[i], api_key, venue_cache),
+            [first_rows[key] for key in search_keys],
+            label=lambda i: f"{venues[i]} {locations[i]}".strip()
+        )
+        result_by_key.update(zip(search_keys, search_results))
+        text_results = [result_by_key.get(key) if key is not None else None for key in row_keys]
+        
+        skipped = sum(key is None for key in row_keys)
+        if skipped:
+            print(f"⚠️ No venue name: {skipped} events")
+        
+        # Step 2: BigQueryをまとめて検索（同じ会場は1回だけ）
+        place_ids = list(dict.fromkeys(
+            r['textsearch_place_id'] for r in text_results if r and r.get('textsearch_place_id')
+        ))
+        details = get_venues_from_bigquery_batch(place_ids, venue_cache)
+        
+        # Step 3: BigQueryにない会場はText Searchで取得済みの詳細を使う
+        searched_details = {
+            r['textsearch_place_id']: {k: v for k, v in r.items() if k.startswith('detailapi_')}
+            for r in text_results if r and r.get('detailapi_place_id')
+        }
+        new_venues = []
+        missing_ids = []
+        for place_id in place_ids:
+            if place_id in details:
+                continue
+            if place_id in searched_details:
+                new_venues.append((place_id, searched_details[place_id]))
+                if venue_cache:
+                    venue_cache.set_venue_detail(place_id, searched_details[place_id])
             else:
-                results.append({})
-                print("⚠️ Venue not found")
-        else:
+                missing_ids.append(place_id)
+        
+        # 詳細を含まない（古い形式のキャッシュの）会場だけDetail API
+        detail_results = _map_each(
+            executor,
+            lambda place_id: fetch_and_store_venue_detail(place_id, api_key, venue_cache, save_to_bigquery=False),
+            missing_ids
+        )
+        new_venues += [
+            (place_id, detail_result)
+            for place_id, detail_result in zip(missing_ids, detail_results)
+            if detail_result
+        ]
+        details.update(new_venues)
+    
+    # Step 4: 新しい会場をまとめてBigQueryに保存
+    save_venues_to_bigquery(new_venues)
+    
+    # Text SearchとDetailの結果をマージ
+    results = []
+    for text_result in text_results:
+        if not text_result:
             results.append({})
-            print("⚠️ No venue name")
+            continue
         
-        # Rate limiting
-        import time
-        time.sleep(0.1)
+        detail_result = details.get(text_result.get('textsearch_place_id'))
+        if detail_result:
+            results.append({**text_result, **detail_result})
+        else:
+            results.append(text_result)
+            print(f"⚠️ Detail retrieval failed: {text_result['textsearch_display_name']}")
     
     return results
 
@@ -694,9 +1321,7 @@ def add_api_data_to_df(df_events, api_results):
     """
     df_eventsにAPIデータを追加
     """
-    df_result = df_events.copy()
-    
-    # 全APIフィールドを初期化
+    # 追加するAPIフィールド
     api_columns = [
         'textsearch_place_id',
         'textsearch_display_name',
@@ -712,46 +1337,79 @@ def add_api_data_to_df(df_events, api_results):
         'detailapi_locality'
     ]
     
-    for col in api_columns:
-        df_result[col] = None
-    
-    # データを追加
-    for i, api_result in enumerate(api_results):
-        if i < len(df_result):
-            for field, value in api_result.items():
-                if field in api_columns:
-                    # typesはJSON文字列に変換（BigQueryから来た場合は既にlist）
-                    if field == 'detailapi_types':
-                        if isinstance(value, list):
-                            df_result.loc[i, field] = json.dumps(value) if value else None
-                        else:
-                            df_result.loc[i, field] = value
-                    else:
-                        df_result.loc[i, field] = value
+    # 結果のリストから一度にDataFrameを作る（行ごとのloc代入をしない）
+    api_results = api_results[:len(df_events)]
+    df_api = pd.DataFrame(list(api_results), columns=api_columns, index=df_events.index[:len(api_results)])
     
-    return df_result
+    # typesはJSON文字列に変換（BigQueryから来た場合は既にlist）
+    df_api['detailapi_types'] = df_api['detailapi_types'].map(
+        lambda v: (_json_dumps(v) if v else None) if isinstance(v, list) else v
+    )
+    
+    # 結果のない行・フィールドは従来通りNone
+    df_api = df_api.reindex(df_events.index).astype(object)
+    df_api = df_api.where(df_api.notna(), None)
+    
+    return pd.concat([df_events.drop(columns=api_columns, errors='ignore'), df_api], axis=1)
+
+def run_batch(jobs: List[Tuple[str, str]], api_key: str, venue_cache: VenueCache = None,
+              gemini_cache: GeminiCache = None, geo_cache: GeoCache = None) -> List[pd.DataFrame]:
+    """
+    複数の(フライヤー画像, IPアドレス)をまとめて処理
+    
+    1. フライヤー分析（複数画像を1リクエストで）とIPの位置情報取得を同時に実行
+    2. 会場・場所の欠損をイベント名・IPの国で補完
+    3. 全フライヤーのイベントをまとめてPlaces API / BigQuery処理（会場の重複は1回だけ）
+    
+    Returns:
+        List[pd.DataFrame]: jobsと同じ順番で、フライヤーごとのdf_final
+    """
+    if not jobs:
+        return []
+    
+    images = [img for img, _ in jobs]
+    ips = list(dict.fromkeys(ip for _, ip in jobs))
+    
+    # フライヤーとIPは互いに依存しないので同時に実行する
+    with ThreadPoolExecutor(max_workers=1 + min(len(ips), MAX_API_WORKERS)) as executor:
+        flyers_future = executor.submit(process_flyer_improved_batch, images, api_key, gemini_cache)
+        geo_infos = dict(zip(ips, executor.map(lambda ip: get_geo_info(ip, geo_cache), ips)))
+        flyer_dfs = flyers_future.result()
+    
+    # job_id列を付けて1つのDataFrameにまとめる
+    frames = []
+    for job_id, ((_, ip), df_events) in enumerate(zip(jobs, flyer_dfs)):
+        df_events = df_events.copy()
+        df_events.fillna({"venue": df_events["event_name"], "location": geo_infos[ip].get('country')}, inplace=True)
+        df_events['job_id'] = job_id
+        frames.append(df_events)
+    df_events = pd.concat(frames, ignore_index=True)
+    
+    # DataFrameの文字列化はコストがかかるので、出力するレベルのときだけ行う
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s", df_events.to_string())
+    
+    # API処理（BigQuery優先）
+    api_results = process_events_with_bigquery(df_events, api_key, venue_cache)
+    df_final = add_api_data_to_df(df_events, api_results)
+    
+    # job_idごとに分けて返す
+    return [
+        df_final[df_final['job_id'] == job_id].drop(columns='job_id').reset_index(drop=True)
+        for job_id in range(len(jobs))
+    ]
 
 # ------------------------------------------------------------
 # Usage Examples
 # ------------------------------------------------------------
 
 if __name__ == "__main__":
+    # 結果表示はloggerで出す（LOG_LEVEL=DEBUGでイベントごとの詳細と途中のdf_eventsも表示）
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+    
     # ------------------------------------------------------------
-    # BigQuery & Google API 設定
+    # Google API 設定（BigQueryはモジュールレベルで設定済み）
     # ------------------------------------------------------------
-    project_id = "linkflyer-469112"
-    dataset_id = "linkflyer_api"
-    table_id = "venues"
-
-    credentials = service_account.Credentials.from_service_account_file(
-        "/Users/nf/dev/Python/linkflyer_api/credential/linkflyer-469112-5e52e7c54be1.json"
-    )
-
-    bq_client = bigquery.Client(credentials=credentials, project=project_id)
-
-    # Load environment variables from .env.local file
-    env_path = os.path.join(os.path.dirname(__file__), '.env.local')
-    load_dotenv(env_path)
     api_key = os.getenv("NEXT_PUBLIC_GOOGLE_API_KEY")
     
     # ------------------------------------------------------------
@@ -760,6 +1418,7 @@ if __name__ == "__main__":
     cache_manager = CacheManager("cache", default_ttl=3600)  # 1時間のデフォルトTTL
     venue_cache = VenueCache(cache_manager)
     gemini_cache = GeminiCache(cache_manager)
+    geo_cache = GeoCache(cache_manager)
     
     print(f"🔧 Cache initialized. Stats: {cache_manager.get_stats()}")
     
@@ -795,47 +1454,15 @@ if __name__ == "__main__":
     }
     ip = ip_list['tokyo']
 
-    # ------------------------------------------------------------
-    # データ取得 / gemini
-    # ------------------------------------------------------------
-
-    # Process flyer from URL
-    df_events = process_flyer_improved(img, api_key, gemini_cache)
-    print(df_events)
-
-    # ------------------------------------------------------------
-    # データ取得 / ip address
-    # ------------------------------------------------------------
-    # Get geo info from IP
-    geo_info = get_geo_info(ip)
-    ip_country = geo_info['country']
-    ip_region = geo_info['regionName']
-    ip_city = geo_info['city']
-
-    # ------------------------------------------------------------
-    # Fill missing venue and location data
-    # ------------------------------------------------------------
-    df_events["venue"] = df_events["venue"].fillna(df_events["event_name"])
-    df_events['location'] = df_events['location'].fillna(ip_country)
-    
-    # print("\n📊 Final processed events:")
-    # print(df_events)
-
-    # print("\n","=" * 80)
-    # print('ip address / geo info:')
-    # print(geo_info)
+    jobs = [(img, ip)]
 
     # ------------------------------------------------------------
-    # places API
+    # データ取得 / gemini & ip address → places API（BigQuery優先）
     # ------------------------------------------------------------
     # print("📋 Processing Events with BigQuery Priority")
     # print("=" * 50)
     
-    # API処理（BigQuery優先）
-    api_results = process_events_with_bigquery(df_events, api_key, venue_cache)
-    
-    # DataFrameに追加
-    df_final = add_api_data_to_df(df_events, api_results)
+    df_final = run_batch(jobs, api_key, venue_cache, gemini_cache, geo_cache)[0]
     
     # print(f"\n✅ Complete! Shape: {df_final.shape}")
     
@@ -852,5 +1479,6 @@ if __name__ == "__main__":
     # if available_cols:
     #     print(df_final[available_cols].head())
     
-    print(df_final[['date', 'venue', 'textsearch_place_id', 'textsearch_display_name', 'detailapi_country','detailapi_administrative_area_level_1','detailapi_locality']].rename(columns={"detailapi_country":"country","detailapi_administrative_area_level_1":"region","detailapi_locality":"city"}))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s", df_final[['date', 'venue', 'textsearch_place_id', 'textsearch_display_name', 'detailapi_country','detailapi_administrative_area_level_1','detailapi_locality']].rename(columns={"detailapi_country":"country","detailapi_administrative_area_level_1":"region","detailapi_locality":"city"}).to_string())
 